@@ -0,0 +1,197 @@
+"""
+ローカルの疑似WebClassサーバーに対するエンドツーエンドのベンチマーク
+
+fake_server.py を起動し、WebClassClient によるログイン・取得と generate_html による
+HTML生成を通しで実行して、リクエスト数・経過時間・CPU時間・最大メモリを計測する。
+
+  crawl_cold   キャッシュなしでログインして全講義を取得
+  crawl_warm   セッション・解析結果・お知らせのキャッシュがある状態で再取得
+  render       取得結果からHTMLを生成
+
+使い方:
+    python benchmarks/bench_e2e.py
+    python benchmarks/bench_e2e.py --courses 40 --latency 30 --workers 1 4 8
+    python benchmarks/bench_e2e.py --json result.json
+    python benchmarks/bench_e2e.py --compare result.json  # 遅くなった項目があれば終了コード1
+"""
+import argparse
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from webclass_client import WebClassClient  # noqa: E402
+from webclass_client.snapshot import split_snapshots  # noqa: E402
+from html_generator import generate_html  # noqa: E402
+from fake_server import FakeWebClass  # noqa: E402
+
+# 比較で回帰とみなす指標（小さいほど良い）
+COMPARED_METRICS = ("wall", "cpu", "requests", "peak_mib")
+
+
+def _client(url, workers, cache_dir=None):
+    options = {}
+    if cache_dir is not None:
+        options = {
+            "session_cache_file": cache_dir / "session.json",
+            "response_cache_file": cache_dir / "responses.json",
+            "message_store_file": cache_dir / "messages.json",
+        }
+    client = WebClassClient(url, max_workers=workers, **options)
+    client.set_login_info("bench", "bench")
+    return client
+
+
+def _crawl(url, workers, cache_dir=None):
+    with _client(url, workers, cache_dir) as client:
+        if not client.login():
+            raise RuntimeError("login failed")
+        return client.crawl()
+
+
+def _measure(func, server, repeat, setup=None):
+    """
+    func を repeat 回実行し、経過時間とCPU時間は最小値を返す
+
+    最大メモリはtracemallocの影響で時間が伸びるため、別に1回実行して計測する。
+    """
+    best_wall = best_cpu = None
+    requests = 0
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        server.reset_counts()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        result = func()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        requests = server.total_requests
+        best_wall = wall if best_wall is None else min(best_wall, wall)
+        best_cpu = cpu if best_cpu is None else min(best_cpu, cpu)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, {
+        "wall": best_wall,
+        "cpu": best_cpu,
+        "requests": requests,
+        "peak_mib": peak / 1024 / 1024,
+    }
+
+
+def run(args):
+    """全シナリオを実行し、{シナリオ名: 指標} を返す"""
+    results = {}
+    server = FakeWebClass(
+        args.courses, args.items, args.messages, args.latency / 1000, args.jitter / 1000
+    ).start()
+    cache_dir = Path(tempfile.mkdtemp(prefix="webclass_bench_"))
+    try:
+        snapshots = None
+        for workers in args.workers:
+            snapshots, results[f"crawl_cold/w{workers}"] = _measure(
+                lambda: _crawl(server.url, workers), server, args.repeat
+            )
+
+            def warm_up():
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                cache_dir.mkdir()
+                _crawl(server.url, workers, cache_dir)
+
+            # 初回の取得でキャッシュを作り、2回目の取得を計測する
+            _, results[f"crawl_warm/w{workers}"] = _measure(
+                lambda: _crawl(server.url, workers, cache_dir), server, args.repeat, warm_up
+            )
+
+        assignments, messages = split_snapshots(snapshots)
+        logger = logging.getLogger("bench")
+        _, results["render"] = _measure(
+            lambda: generate_html(assignments, messages, logger), server, args.repeat
+        )
+        results["render"]["items"] = len(assignments) + len(messages)
+    finally:
+        server.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """baseline より tolerance の割合以上悪化した (シナリオ, 指標, 前回, 今回) のリスト"""
+    regressions = []
+    for name, metrics in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key in COMPARED_METRICS:
+            before, after = previous.get(key), metrics.get(key)
+            if before is None or after is None:
+                continue
+            # ごく短い時間は誤差が大きいため、5ms未満の差は無視する
+            if key in ("wall", "cpu") and after - before < 0.005:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append((name, key, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--items", type=int, default=60, help="講義ページあたりの項目数")
+    parser.add_argument("--messages", type=int, default=30, help="講義あたりのお知らせ数")
+    parser.add_argument("--latency", type=float, default=20.0, help="応答ごとの遅延（ミリ秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延に加える乱数の幅（ミリ秒）")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", metavar="FILE", help="結果をJSONで保存する")
+    parser.add_argument("--compare", metavar="FILE", help="以前の --json の結果と比較する")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="回帰とみなす悪化の割合")
+    args = parser.parse_args()
+
+    # クライアントの進捗ログは計測の妨げになるため警告以上だけにする
+    logging.disable(logging.INFO)
+
+    print(
+        f"courses: {args.courses}  items/course: {args.items}  messages/course: {args.messages}"
+        f"  latency: {args.latency:.0f}ms"
+    )
+    results = run(args)
+
+    print(f"{'scenario':<16}{'requests':>9}{'wall ms':>10}{'cpu ms':>10}{'peak MiB':>10}")
+    for name, metrics in results.items():
+        print(
+            f"{name:<16}{metrics['requests']:>9}{metrics['wall'] * 1000:>10.1f}"
+            f"{metrics['cpu'] * 1000:>10.1f}{metrics['peak_mib']:>10.2f}"
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"saved: {args.json}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        for name, key, before, after in regressions:
+            print(f"REGRESSION {name} {key}: {before:.4g} -> {after:.4g}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+HTMLパーサーのベンチマーク
+
+講義ページの解析時間を、パーサー（html.parser / lxml）と解析範囲
+（ページ全体 / コンテンツ領域のみ / コンテンツ領域のみ＋課題の抽出に
+不要な項目の読み飛ばし）の組み合わせごとに計測する。
+
+使い方:
+    python benchmarks/bench_parser.py                 # 合成ページで計測
+    python benchmarks/bench_parser.py page1.html ...  # 保存した実際の講義ページで計測
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from webclass_client import lectures  # noqa: E402
+from webclass_client.assignments import assignment_filter  # noqa: E402
+from synthetic import course_page  # noqa: E402
+
+
+def _bench(pages, parser, scoped, repeat, item_filter=None):
+    logger = logging.getLogger("bench")
+    strainer = lectures.COURSE_STRAINER
+    if not scoped:
+        lectures.COURSE_STRAINER = None
+    try:
+        items = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for html in pages:
+                info = lectures.parse_lecture_info(html, logger, parser, item_filter=item_filter)
+                items += len(info)
+        elapsed = time.perf_counter() - start
+    finally:
+        lectures.COURSE_STRAINER = strainer
+    return elapsed / (repeat * len(pages)), items // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("pages", nargs="*", help="講義ページのHTMLファイル")
+    parser.add_argument("--items", type=int, default=120, help="合成ページの項目数")
+    parser.add_argument("--count", type=int, default=10, help="合成ページの数")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--date", default="2024/06/01 00:00",
+        help="filtered で課題の受付期間の判定に使う日時（YYYY/MM/DD HH:MM）"
+    )
+    args = parser.parse_args()
+    pushdown = assignment_filter(datetime.strptime(args.date, "%Y/%m/%d %H:%M"))
+
+    if args.pages:
+        pages = [Path(p).read_text(encoding="utf-8", errors="replace") for p in args.pages]
+    else:
+        pages = [course_page(f"C{i:03d}", args.items) for i in range(args.count)]
+    size = sum(len(p) for p in pages) / len(pages)
+    print(f"pages: {len(pages)}  average size: {size / 1024:.1f} KiB")
+
+    baseline = None
+    print(f"{'parser':<12}{'scope':<10}{'ms/page':>10}{'items':>8}{'speedup':>9}")
+    for name in ("html.parser", "lxml"):
+        if lectures.resolve_parser(name, logging.getLogger("bench")) != name:
+            print(f"{name:<12}(not installed)")
+            continue
+        for scope, scoped, item_filter in (
+            ("full", False, None), ("content", True, None), ("filtered", True, pushdown)
+        ):
+            per_page, items = _bench(pages, name, scoped, args.repeat, item_filter)
+            baseline = baseline or per_page
+            print(f"{name:<12}{scope:<10}{per_page * 1000:>10.2f}{items:>8}{baseline / per_page:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+HTML生成のベンチマーク
+
+お知らせ・課題の件数を増やしながら generate_html / write_html の時間を計測し、
+件数あたりの時間がほぼ一定（線形）であることを確認する。
+
+使い方:
+    python benchmarks/bench_render.py
+    python benchmarks/bench_render.py --sizes 1000 10000 50000
+"""
+import argparse
+import io
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from html_generator import generate_html, write_html  # noqa: E402
+from webclass_client.models import Assignment, Message  # noqa: E402
+
+
+def make_data(n_messages, n_assignments, n_subjects=20):
+    """合成データ"""
+    assignments = [
+        Assignment(
+            f"第{i}回 レポート <課題>",
+            "レポート",
+            datetime(2024, 4, 1, 9, 0),
+            datetime(2030 + i % 60, 1 + i % 12, 1 + i % 28, 23, 59),
+            subject=f"講義{i % n_subjects}",
+        )
+        for i in range(n_assignments)
+    ]
+    messages = [
+        Message(f"講義{i % n_subjects}", f"お知らせ{i}: " + "連絡事項 & 注意点があります。" * (1 + i % 5))
+        for i in range(n_messages)
+    ]
+    return assignments, messages
+
+
+def _time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 20000, 40000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    print(f"{'messages':>10}{'assignments':>13}{'generate ms':>13}{'write ms':>10}{'us/item':>9}{'MiB':>7}")
+    for size in args.sizes:
+        assignments, messages = make_data(size, size // 10)
+        items = len(assignments) + len(messages)
+        generate = _time(lambda: generate_html(assignments, messages, logger), args.repeat)
+        buffer = io.StringIO()
+
+        def write():
+            buffer.seek(0)
+            buffer.truncate()
+            write_html(assignments, messages, logger, buffer)
+
+        written = _time(write, args.repeat)
+        mib = len(buffer.getvalue().encode("utf-8")) / 1024 / 1024
+        print(
+            f"{size:>10}{len(assignments):>13}{generate * 1000:>13.1f}{written * 1000:>10.1f}"
+            f"{generate / items * 1e6:>9.2f}{mib:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+ベンチマーク用のWebClass互換ローカルサーバー
+
+ログイン・ダッシュボード・講義ログイン・講義ページ・タイムラインAPI・ログアウトに
+synthetic.py の合成ページで応答する。講義数・項目数・お知らせ数と、
+応答ごとの遅延を指定できる。
+
+使い方:
+    python benchmarks/fake_server.py --courses 20 --latency 50 --port 8080
+    （環境変数 WEBCLASS_URL=http://127.0.0.1:8080 を設定して実行すると、main.py を
+    このサーバーに対してそのまま試せる。ユーザー名・パスワードは任意の値でよい）
+"""
+import argparse
+import collections
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from synthetic import course_page, dashboard_page, message_records
+
+_COURSE_LOGIN = re.compile(r"^/webclass/course\.php/(\w+)/login")
+_MESSAGES = re.compile(r"^/webclass/course\.php/(\w+)/api/timeline/messages")
+_COURSE = re.compile(r"^/webclass/course\.php/(\w+)/")
+# 講義ページに埋め込むacsトークンの目印（応答ごとに講義ログインで発行したトークンに置き換える）
+_ACS_PLACEHOLDER = "ACSPLACEHOLDER"
+
+
+class FakeWebClass:
+    """
+    合成ページを返すWebClass互換サーバー
+
+    実際のサーバーと同様に、講義ログインのたびに新しいacsトークンを発行し、
+    講義ページのリンクにはそのトークンを埋め込む。
+    """
+
+    def __init__(self, courses=10, items=60, messages=20, latency=0.0, jitter=0.0, seed=0):
+        """
+        初期化
+
+        Args:
+            courses: 講義数
+            items: 講義ページあたりの項目数
+            messages: 講義あたりのお知らせ数
+            latency: 応答ごとの遅延（秒）
+            jitter: 遅延に加える一様乱数の幅（秒）
+            seed: 講義ページ生成の乱数シード
+        """
+        self.lecture_ids = [f"C{i:04d}" for i in range(courses)]
+        self.latency = latency
+        self.jitter = jitter
+        self.counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._dashboard = dashboard_page(self.lecture_ids).encode("utf-8")
+        self._courses = {
+            lecture_id: course_page(
+                lecture_id, items, seed=seed + i, acs=_ACS_PLACEHOLDER
+            ).encode("utf-8")
+            for i, lecture_id in enumerate(self.lecture_ids)
+        }
+        self._course_acs = {}
+        self._acs_serial = 0
+        self._records = {
+            lecture_id: message_records(lecture_id, messages) for lecture_id in self.lecture_ids
+        }
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_requests(self):
+        with self._lock:
+            return sum(self.counts.values())
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts.clear()
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.counts[endpoint] += 1
+
+    def _delay(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def start(self, host="127.0.0.1", port=0):
+        """別スレッドでサーバーを起動"""
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """サーバーを停止"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start() if self._server is None else self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def handle(self, method, path):
+        """(エンドポイント名, ステータス, Content-Type, 本文, 追加ヘッダー) を返す"""
+        parts = urlsplit(path)
+        if method == "POST" and parts.path == "/webclass/login.php":
+            body = b'<html><body><a href="/webclass/?acs_=loginacs">dashboard</a></body></html>'
+            return "login", 200, "text/html; charset=utf-8", body, [
+                ("Set-Cookie", "WBT_Session=benchsession; Path=/")
+            ]
+        if parts.path == "/webclass/logout.php":
+            return "logout", 200, "text/html; charset=utf-8", b"bye", []
+        if method == "GET" and parts.path in ("/webclass/", "/webclass"):
+            return "dashboard", 200, "text/html; charset=utf-8", self._dashboard, []
+
+        match = _COURSE_LOGIN.match(parts.path)
+        if method == "POST" and match and match.group(1) in self._courses:
+            lecture_id = match.group(1)
+            with self._lock:
+                self._acs_serial += 1
+                acs = f"course{lecture_id}n{self._acs_serial}"
+                self._course_acs[lecture_id] = acs
+            body = f'<a href="/webclass/course.php/{lecture_id}/?acs_={acs}">go</a>'
+            return "course_login", 200, "text/html; charset=utf-8", body.encode("utf-8"), []
+
+        match = _MESSAGES.match(parts.path)
+        if method == "GET" and match and match.group(1) in self._records:
+            newer_than = parse_qs(parts.query).get("newer_than", ["2000-01-01 00:00:00"])[0]
+            records = [
+                record for record in self._records[match.group(1)]
+                if record["date"] > newer_than
+            ]
+            body = json.dumps({"records": records}, ensure_ascii=False).encode("utf-8")
+            return "messages", 200, "application/json", body, []
+
+        match = _COURSE.match(parts.path)
+        if method == "GET" and match and match.group(1) in self._courses:
+            lecture_id = match.group(1)
+            with self._lock:
+                acs = self._course_acs.get(lecture_id, "courseacs")
+            body = self._courses[lecture_id].replace(
+                _ACS_PLACEHOLDER.encode("ascii"), acs.encode("ascii")
+            )
+            return "course", 200, "text/html; charset=utf-8", body, []
+
+        return "not_found", 404, "text/plain", b"not found", []
+
+
+def _make_handler(app):
+    class Handler(BaseHTTPRequestHandler):
+        # 接続を使い回せるようにする（実際のサーバーと同様にプールの効果を計測する）
+        protocol_version = "HTTP/1.1"
+        # ヘッダーと本文を別々に送るため、Nagleアルゴリズムによる遅延を避ける
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _respond(self, method):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            endpoint, status, content_type, body, headers = app.handle(method, self.path)
+            app._count(endpoint)
+            app._delay()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in headers:
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond("GET")
+
+        def do_POST(self):
+            self._respond("POST")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--courses", type=int, default=10)
+    parser.add_argument("--items", type=int, default=60)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="応答ごとの遅延（ミリ秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延に加える乱数の幅（ミリ秒）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    app = FakeWebClass(
+        args.courses, args.items, args.messages, args.latency / 1000, args.jitter / 1000
+    )
+    app.start(args.host, args.port)
+    print(f"listening on {app.url}  (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.stop()
+        print(dict(app.counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+ベンチマーク用の合成WebClassページ
+"""
+import random
+
+CATEGORIES = ["資料", "レポート", "テスト", "アンケート"]
+
+# 実際のページと同様に、解析対象外のヘッダー・サイドバー・スクリプトを含める
+_PAGE_HEAD = """<!DOCTYPE html>
+<html lang="ja">
+<head>
+<meta charset="UTF-8">
+<title>WebClass</title>
+<script>{script}</script>
+</head>
+<body>
+<nav class="navbar navbar-default">{nav}</nav>
+<div class="container-fluid">
+<div class="row">
+<div class="col-xs-12 col-sm-4 col-md-3 col-lg-2"><ul class="sidebar">{sidebar}</ul></div>
+"""
+_PAGE_TAIL = """</div>
+</div>
+<footer>{footer}</footer>
+</body>
+</html>
+"""
+
+
+def _chrome(seed):
+    rng = random.Random(seed)
+    return {
+        "script": "var cfg = {" + ",".join(f"k{i}: {rng.random()}" for i in range(200)) + "};",
+        "nav": "".join(f'<li><a href="/webclass/menu/{i}">メニュー{i}</a></li>' for i in range(40)),
+        "sidebar": "".join(
+            f'<li class="item"><span>項目{i}</span><a href="/webclass/link/{i}">リンク</a></li>'
+            for i in range(120)
+        ),
+        "footer": "".join(f"<p>フッター情報{i}</p>" for i in range(30)),
+    }
+
+
+def dashboard_page(lecture_ids, acs="dashboardacs"):
+    """講義一覧の表を含むダッシュボード"""
+    chrome = _chrome(0)
+    rows = "".join(
+        f'<tr><td><a href="/webclass/course.php/{lecture_id}/login?acs_={acs}{i}">'
+        f'» 2024年度 講義{i} ({lecture_id})</a></td><td>教員{i}</td></tr>'
+        for i, lecture_id in enumerate(lecture_ids)
+    )
+    return (
+        _PAGE_HEAD.format(**chrome)
+        + f'<div class="col-xs-12 col-sm-8 col-md-9 col-lg-10"><table class="table">{rows}</table></div>'
+        + _PAGE_TAIL.format(**chrome)
+    )
+
+
+def course_page(lecture_id, n_items=60, sections=6, seed=None, now_year=2024, acs="courseacs"):
+    """
+    コンテンツ一覧を含む講義ページ（資料・課題・期限切れの項目が混在する）
+
+    実際のページと同様に、項目のリンクには講義ログインで得たacsトークンが入る。
+    """
+    rng = random.Random(seed if seed is not None else lecture_id)
+    chrome = _chrome(seed or 1)
+    parts = []
+    per_section = max(1, n_items // sections)
+    index = 0
+    for s in range(sections):
+        items = []
+        for _ in range(per_section):
+            category = rng.choice(CATEGORIES)
+            month = rng.randint(1, 12)
+            day = rng.randint(1, 28)
+            start = f"{now_year}/{month:02d}/{day:02d} 09:00"
+            end_year = now_year + rng.choice([0, 0, 1, 5])
+            end = f"{end_year}/{month:02d}/{day:02d} 23:59"
+            items.append(
+                '<section class="list-group-item cl-contentsList_listGroupItem">'
+                '<div class="cl-contentsList_content">'
+                f'<h4 class="cm-contentsList_contentName">{"New" if index % 5 == 0 else ""}'
+                f'{category}{index} 第{s + 1}回の内容について</h4>'
+                f'<a class="cm-contentsList_contentLink" href="/webclass/do/contents/{lecture_id}/{index}'
+                f'?acs_={acs}">開く</a>'
+                f'<div class="cl-contentsList_categoryLabel">{category}</div>'
+                '<div class="cm-contentsList_contentDetailList">'
+                '<div class="cm-contentsList_contentDetailListItemLabel">利用可能期間</div>'
+                f'<div class="cm-contentsList_contentDetailListItemData">{start} - {end}</div>'
+                '</div>'
+                f'<p class="description">{"説明文" * rng.randint(5, 40)}</p>'
+                '</div></section>'
+            )
+            index += 1
+        parts.append(
+            '<section class="panel panel-default cl-contentsList_folder">'
+            f'<div class="panel-heading"><h4 class="panel-title">第{s + 1}回</h4></div>'
+            + "".join(items)
+            + "</section>"
+        )
+    return (
+        _PAGE_HEAD.format(**chrome)
+        + '<div class="col-xs-12 col-sm-8 col-md-9 col-lg-10">'
+        + "".join(parts)
+        + "</div>"
+        + _PAGE_TAIL.format(**chrome)
+    )
+
+
+def message_records(lecture_id, n_messages, start_year=2024):
+    """タイムラインAPIのレコード"""
+    return [
+        {
+            "message": f"{lecture_id} のお知らせ{i}: " + "連絡事項があります。" * (1 + i % 7),
+            "date": f"{start_year}-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:00:00",
+        }
+        for i in range(n_messages)
+    ]
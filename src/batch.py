@@ -0,0 +1,250 @@
+"""
+複数アカウントの一括取得
+"""
+import json
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from webclass_client import RequestBudget, TokenBucket, WebClassClient
+from webclass_client.logger_setup import close_logger, setup_logger
+from config import (
+    WEBCLASS_URL, DEFAULT_DATE, LOG_FILE, SESSION_CACHE_FILE, RESPONSE_CACHE_FILE,
+    RESPONSE_CACHE_MAX_ENTRIES, MESSAGE_STORE_FILE, STORE_FILE, REQUEST_BUDGET_FILE,
+    REQUEST_BUDGET_PER_DAY, HTML_PARSER, HTML_OUTPUT_FILE, HTML_FRAGMENT_CACHE_FILE,
+    HTML_SEARCH_INDEX_FILE, HTML_EXTERNAL_ASSETS, HTML_MESSAGES_MODE, HTML_MESSAGES_PAGE_SIZE,
+    HTTP_TIMEOUT, HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF, HTTP_RATE_LIMIT, HTTP_RATE_BURST
+)
+from html_generator import FragmentCache, write_snapshots_html
+from search_index import SearchIndex
+
+REPORT_FILE_NAME = "batch_report.json"
+
+
+def load_accounts(path):
+    """
+    アカウントファイルを読み込む
+
+    ファイルは {"name": 表示名, "username": ユーザー名, "password": パスワード} の
+    JSON配列。name を省略した場合は username を使う。"url" を指定すると
+    そのアカウントだけ config.py の WEBCLASS_URL とは別のWebClassに接続する。
+
+    Returns:
+        アカウントの辞書のリスト
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("アカウントファイルはJSON配列で記述してください")
+
+    accounts = []
+    dir_names = {}
+    for i, entry in enumerate(data):
+        username = entry.get("username")
+        password = entry.get("password")
+        if not username or not password:
+            raise ValueError(f"{i + 1}件目のアカウントに username または password がありません")
+        name = entry.get("name") or username
+        # 出力ディレクトリが同じになる名前（"a b" と "a_b"、大文字・小文字の違い）も重複とみなす
+        dir_name = _dir_name(name).casefold()
+        if dir_name in dir_names:
+            raise ValueError(
+                f"アカウント名 {name} が {dir_names[dir_name]} と重複しています"
+                "（出力ディレクトリが同じになります）"
+            )
+        dir_names[dir_name] = name
+        accounts.append({
+            "name": name, "username": username, "password": password,
+            "url": entry.get("url") or WEBCLASS_URL,
+        })
+    return accounts
+
+
+def account_output_dir(base_dir, name):
+    """アカウントごとの出力ディレクトリ（ファイル名に使えない文字は _ に置き換える）"""
+    return Path(base_dir) / _dir_name(name)
+
+
+def _dir_name(name):
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def run_account(account, output_dir, max_workers=1, rate_limiter=None, rate_limit=None):
+    """
+    1アカウント分のログイン・取得・HTML生成を行う
+
+    セッションキャッシュ・各種キャッシュ・DB・HTMLはすべて output_dir 配下の
+    アカウント専用のファイルを使う。プロセスプールから呼べるよう、例外は
+    送出せず結果の辞書に記録する。
+
+    Args:
+        rate_limiter: 共有のTokenBucket（スレッドで並列化する場合）
+        rate_limit: rate_limiter がない場合に、このアカウント専用に作る流量制限（リクエスト/秒）
+
+    Returns:
+        name, ok, error, assignments, messages, requests と各段階の所要時間（秒）の辞書
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logger = setup_logger(f"{__name__}.{output_dir.name}", log_file=output_dir / LOG_FILE.name)
+    result = {
+        "name": account["name"], "ok": False, "error": None,
+        "assignments": 0, "messages": 0, "requests": 0,
+        "login_seconds": 0.0, "crawl_seconds": 0.0, "render_seconds": 0.0, "elapsed": 0.0,
+    }
+    budget = RequestBudget(REQUEST_BUDGET_PER_DAY, output_dir / REQUEST_BUDGET_FILE.name)
+    if rate_limiter is None and rate_limit:
+        rate_limiter = TokenBucket(rate_limit, max(1, HTTP_RATE_BURST * rate_limit / HTTP_RATE_LIMIT))
+    used_before = budget.used
+    started = time.perf_counter()
+    try:
+        if not budget.can_afford(1):
+            raise RuntimeError("本日のリクエスト数が上限に達しています")
+        with WebClassClient(
+            account["url"], debug_mode=False, max_workers=max_workers,
+            session_cache_file=output_dir / SESSION_CACHE_FILE.name,
+            response_cache_file=output_dir / RESPONSE_CACHE_FILE.name,
+            response_cache_size=RESPONSE_CACHE_MAX_ENTRIES,
+            message_store_file=output_dir / MESSAGE_STORE_FILE.name,
+            store_file=output_dir / STORE_FILE.name,
+            parser=HTML_PARSER,
+            request_budget=budget,
+            timeout=HTTP_TIMEOUT,
+            max_retries=HTTP_MAX_RETRIES,
+            retry_backoff=HTTP_RETRY_BACKOFF,
+            rate_limiter=rate_limiter
+        ) as client:
+            client.set_login_info(account["username"], account["password"])
+
+            phase = time.perf_counter()
+            if not client.login():
+                raise RuntimeError("ログインに失敗しました")
+            result["login_seconds"] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            snapshots = client.crawl(datetime.now(), DEFAULT_DATE)
+            result["crawl_seconds"] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            write_snapshots_html(
+                snapshots, logger, output_dir / HTML_OUTPUT_FILE.name,
+                FragmentCache(output_dir / HTML_FRAGMENT_CACHE_FILE.name),
+                SearchIndex(output_dir / HTML_SEARCH_INDEX_FILE.name)
+                if HTML_SEARCH_INDEX_FILE else None,
+                HTML_EXTERNAL_ASSETS, HTML_MESSAGES_MODE, HTML_MESSAGES_PAGE_SIZE
+            )
+            result["render_seconds"] = time.perf_counter() - phase
+
+        result["assignments"] = sum(len(snapshot["assignments"]) for snapshot in snapshots)
+        result["messages"] = sum(len(snapshot["messages"]) for snapshot in snapshots)
+        result["ok"] = True
+    except Exception as e:
+        logger.error(f"アカウント {account['name']} の処理に失敗しました: {e}")
+        result["error"] = str(e)
+    finally:
+        budget.save()
+        result["requests"] = budget.used - used_before
+        result["elapsed"] = time.perf_counter() - started
+        # スレッドで多数のアカウントを処理してもログファイルを開いたままにしない
+        close_logger(logger)
+    return result
+
+
+def run_batch(accounts, base_dir, logger, max_concurrency=16, workers_per_account=2,
+              use_processes=False):
+    """
+    複数のアカウントを並列に処理する
+
+    同時に処理するアカウント数は max_concurrency // workers_per_account とし、
+    全アカウント合計の同時リクエスト数が max_concurrency を超えないようにする。
+    流量制限（HTTP_RATE_LIMIT）は全アカウントで共有する。プロセスで並列化する場合は
+    プロセス間でトークンを共有できないため、同時に処理するアカウント数で等分する。
+
+    Args:
+        accounts: load_accounts() の戻り値
+        base_dir: アカウントごとの出力ディレクトリを作る親ディレクトリ
+        logger: ロガー
+        max_concurrency: 全アカウント合計の同時リクエスト数の上限
+        workers_per_account: 1アカウント内で並列に取得する講義数
+        use_processes: Trueの場合はスレッドではなくプロセスで並列化する
+
+    Returns:
+        run_account() の結果のリスト（アカウントファイルの順）
+    """
+    workers_per_account = max(1, min(workers_per_account, max_concurrency))
+    parallel = max(1, min(max_concurrency // workers_per_account, len(accounts)))
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    if not HTTP_RATE_LIMIT:
+        rate_limiter, rate_limit = None, None
+    elif use_processes:
+        rate_limiter, rate_limit = None, HTTP_RATE_LIMIT / parallel
+    else:
+        rate_limiter, rate_limit = TokenBucket(HTTP_RATE_LIMIT, HTTP_RATE_BURST), None
+    logger.info(
+        f"{len(accounts)}件のアカウントを処理します"
+        f"（同時に{parallel}件, 1件あたり{workers_per_account}並列）"
+    )
+
+    started = time.perf_counter()
+    results = {}
+    with executor_class(max_workers=parallel) as executor:
+        futures = {
+            executor.submit(
+                run_account, account,
+                account_output_dir(base_dir, account["name"]), workers_per_account,
+                rate_limiter, rate_limit
+            ): account["name"]
+            for account in accounts
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # プロセスの異常終了など run_account の外で起きた失敗
+                result = {"name": name, "ok": False, "error": str(e), "elapsed": 0.0}
+            results[name] = result
+            if result["ok"]:
+                logger.info(f"{name}: 完了 {result['elapsed']:.1f}秒")
+            else:
+                logger.warning(f"{name}: 失敗 {result['error']}")
+
+    ordered = [results[account["name"]] for account in accounts]
+    write_report(ordered, base_dir, time.perf_counter() - started, logger)
+    return ordered
+
+
+def write_report(results, base_dir, elapsed, logger):
+    """アカウントごとの所要時間と失敗をまとめたレポートを保存"""
+    failed = [result for result in results if not result["ok"]]
+    report = {
+        "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "elapsed": elapsed,
+        "accounts": len(results),
+        "failed": len(failed),
+        "results": results,
+    }
+    path = Path(base_dir) / REPORT_FILE_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    logger.info(
+        f"{len(results)}件中{len(results) - len(failed)}件成功, {len(failed)}件失敗"
+        f"（合計 {elapsed:.1f}秒）"
+    )
+    slowest = sorted(
+        (result for result in results if result["ok"]), key=lambda r: r["elapsed"], reverse=True
+    )
+    for result in slowest[:5]:
+        logger.info(
+            f"  {result['name']}: {result['elapsed']:.1f}秒"
+            f"（ログイン {result['login_seconds']:.1f}秒, 取得 {result['crawl_seconds']:.1f}秒,"
+            f" HTML {result['render_seconds']:.1f}秒, {result['requests']}リクエスト）"
+        )
+    for result in failed:
+        logger.warning(f"  {result['name']}: {result['error']}")
+    logger.info(f"レポートを保存しました: {path}")
+    return path
@@ -12,14 +12,52 @@ LOG_DIR = OUTPUT_DIR
 # ログ設定
 LOG_FILE = LOG_DIR / "webclass.log"
 DEBUG_LOG_FILE = PROJECT_ROOT / ".webclass_debug.log"  # 隠しファイル化
-EXECUTION_HISTORY_FILE = OUTPUT_DIR / ".execution_history.json"  # 隠しファイル化
+REQUEST_BUDGET_FILE = OUTPUT_DIR / ".request_budget.json"  # 隠しファイル化（本日のリクエスト数）
+SESSION_CACHE_FILE = OUTPUT_DIR / ".session_cache.json"  # 隠しファイル化（所有者のみ読み書き可）
+RESPONSE_CACHE_FILE = OUTPUT_DIR / ".response_cache.json"  # 隠しファイル化
+RESPONSE_CACHE_MAX_ENTRIES = 128  # 講義ページの解析結果キャッシュの上限
+MESSAGE_STORE_FILE = OUTPUT_DIR / ".message_store.json"  # 隠しファイル化（取得済みお知らせ）
+STORE_FILE = OUTPUT_DIR / "webclass.sqlite3"  # 講義・課題・お知らせのローカルDB
 
 # WebClass設定
-WEBCLASS_URL = "https://els.sa.dendai.ac.jp"
+WEBCLASS_URL = os.environ.get("WEBCLASS_URL", "https://els.sa.dendai.ac.jp")  # 環境変数で上書き可（疑似サーバーでの確認用）
 DEFAULT_DATE = "2000-01-01"
+MAX_WORKERS = 4  # 講義を並列に取得するスレッド数（1で逐次取得）
+HTML_PARSER = "html.parser"  # "lxml" をインストールしている場合は "lxml" で高速化できる
+
+# 通信設定
+HTTP_POOL_SIZE = None  # 接続プールの接続数（NoneでMAX_WORKERSに合わせる。最小10）
+HTTP_TIMEOUT = (10, 30)  # リクエストごとのタイムアウト（接続, 読み込み）秒
+HTTP_MAX_RETRIES = 3  # 接続エラー・5xx・429応答を再試行する回数
+HTTP_RETRY_BACKOFF = 0.5  # 再試行の待ち時間の基準（秒）。試行ごとに倍になり、ジッターを加える
+HTTP_RATE_LIMIT = 5.0  # 1秒あたりに送るリクエスト数の上限（Noneで無制限）。複数アカウントの場合は全体の上限
+HTTP_RATE_BURST = 10  # 連続して送れるリクエスト数
 
 # セキュリティ設定
-DAILY_EXECUTION_LIMIT = True
+REQUEST_BUDGET_PER_DAY = 1000  # 1日あたりに送るリクエスト数の上限（Noneで無制限）
+
+# 計測設定
+METRICS_FILE = OUTPUT_DIR / "metrics.json"  # リクエスト数・転送量・所要時間の集計
+METRICS_PROMETHEUS_FILE = OUTPUT_DIR / "webclass.prom"  # node_exporterのtextfile collector用
+PROFILE_DIR = OUTPUT_DIR / "profile"  # --profile を付けた場合のcProfile・tracemallocの出力先
+
+# 複数アカウント設定（python main.py --accounts accounts.json）
+BATCH_OUTPUT_DIR = OUTPUT_DIR / "accounts"  # アカウントごとの出力ディレクトリを作る場所
+BATCH_MAX_CONCURRENCY = 16  # 全アカウント合計の同時リクエスト数の上限
+BATCH_WORKERS_PER_ACCOUNT = 2  # 1アカウント内で並列に取得する講義数
+BATCH_USE_PROCESSES = False  # Trueにするとスレッドではなくプロセスでアカウントを並列処理する
+
+# 常駐モード設定（python main.py --daemon）
+POLL_MIN_INTERVAL = 5 * 60  # 講義を取得し直す最短間隔（秒）。変更があった講義はこの間隔に戻る
+POLL_MAX_INTERVAL = 6 * 60 * 60  # 変更のない講義の取得間隔はこの値まで延びる（秒）
+POLL_BACKOFF = 2.0  # 変更がなかった場合に取得間隔を延ばす倍率
+POLL_DEADLINE_POLLS = 12  # 期限が近い課題がある講義は、期限までにこの回数程度は取得する
+CATALOG_REFRESH_INTERVAL = 60 * 60  # 講義一覧を取得し直す間隔（秒）。セッションの維持を兼ねる
 
 # HTML出力設定
-HTML_OUTPUT_FILE = OUTPUT_DIR / "webclass_info.html" 
+HTML_OUTPUT_FILE = OUTPUT_DIR / "webclass_info.html"
+HTML_FRAGMENT_CACHE_FILE = OUTPUT_DIR / ".html_fragments.json"  # 隠しファイル化（講義ごとのHTML断片）
+HTML_EXTERNAL_ASSETS = False  # TrueにするとCSS・JavaScriptをバージョン付きの別ファイルとして出力し、HTMLからリンクする
+HTML_MESSAGES_MODE = "dom"  # "paged" にするとお知らせをJSONで埋め込み、ページ単位で表示する（件数が多い場合向け）
+HTML_MESSAGES_PAGE_SIZE = 50  # "paged" の場合に1ページに表示するお知らせの件数
+HTML_SEARCH_INDEX_FILE = OUTPUT_DIR / ".search_index.json"  # 隠しファイル化（お知らせの検索インデックス。Noneで検索欄を出さない）
@@ -1,88 +1,453 @@
 """
 HTML生成モジュール
 """
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import textwrap
 from datetime import datetime
-from utils import calculate_urgency
+from html import escape
+from webclass_client.metrics import METRICS
+from webclass_client.snapshot import split_snapshots
 
 
-def generate_html(assignments, messages_with_subject, logger):
+MESSAGES_MODE_DOM = "dom"
+MESSAGES_MODE_PAGED = "paged"
+
+
+@METRICS.timed("render_html")
+def generate_html(assignments, messages, logger, fragment_cache=None, assets=None,
+                  messages_mode=MESSAGES_MODE_DOM, page_size=50, search_index=None):
     """WebClass情報をHTMLとして生成する"""
+    return "".join(iter_html(
+        assignments, messages, logger, fragment_cache, assets,
+        messages_mode, page_size, search_index
+    ))
+
+
+@METRICS.timed("render_html")
+def write_html(assignments, messages, logger, out, fragment_cache=None, assets=None,
+               messages_mode=MESSAGES_MODE_DOM, page_size=50, search_index=None):
+    """WebClass情報をHTMLとしてファイルオブジェクトに書き出す（全体を文字列として組み立てない）"""
+    for chunk in iter_html(
+        assignments, messages, logger, fragment_cache, assets,
+        messages_mode, page_size, search_index
+    ):
+        out.write(chunk)
+
+
+@METRICS.timed("render_html")
+def write_html_file(assignments, messages, logger, path, fragment_cache=None,
+                    external_assets=False, messages_mode=MESSAGES_MODE_DOM, page_size=50,
+                    search_index=None):
+    """
+    WebClass情報をHTMLファイルに書き出す
+
+    一時ファイルに書き出してから置き換えるため、途中で失敗しても既存のファイルは
+    壊れない。内容が既存のファイルと同じ場合は置き換えない。
+    external_assets がTrueの場合、CSSとJavaScriptはHTMLと同じディレクトリに
+    バージョン付きのファイルとして書き出し、HTMLからはリンクする。
+
+    Returns:
+        ファイルを更新した場合はTrue
+    """
+    path = os.fspath(path)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    assets = write_static_assets(directory) if external_assets else None
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(prefix=".webclass_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            for chunk in iter_html(
+                assignments, messages, logger, fragment_cache, assets,
+                messages_mode, page_size, search_index
+            ):
+                f.write(chunk)
+                digest.update(chunk.encode("utf-8"))
+        if _file_hash(path) == digest.hexdigest():
+            os.remove(tmp_path)
+            logger.info("HTMLの内容に変更がないため書き込みを省略しました")
+            return False
+        # mkstemp の一時ファイルは所有者のみ読み書きできるため、通常のファイルと同じ権限にする
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_snapshots_html(snapshots, logger, path, fragment_cache=None, search_index=None,
+                         external_assets=False, messages_mode=MESSAGES_MODE_DOM, page_size=50):
+    """
+    crawl()の結果からHTMLファイルを生成し、断片キャッシュと検索インデックスを保存する
+
+    Returns:
+        ファイルを更新した場合はTrue
+    """
+    assignment_info, messages = split_snapshots(snapshots)
+    logger.info(f"課題情報を取得しました: {len(assignment_info)}件")
+    logger.info(f"お知らせを取得しました: {len(messages)}件")
+
+    logger.info("HTMLファイルを生成中...")
+    updated = write_html_file(
+        assignment_info, messages, logger, path, fragment_cache,
+        external_assets, messages_mode, page_size, search_index
+    )
+    if updated:
+        logger.info(f"HTMLファイルを生成しました: {path}")
+    if fragment_cache is not None:
+        fragment_cache.save()
+    if search_index is not None:
+        search_index.save()
+    return updated
+
+
+def _file_mode(path):
+    """既存ファイルの権限（ファイルがなければ umask を適用した 0o666）"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def _file_hash(path):
+    """既存ファイルの内容のハッシュ（ファイルがなければNone）"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def iter_html(assignments, messages, logger, fragment_cache=None, assets=None,
+              messages_mode=MESSAGES_MODE_DOM, page_size=50, search_index=None):
+    """
+    WebClass情報のHTMLを先頭から順に断片として返すジェネレーター
+
+    Args:
+        assets: write_static_assets() の戻り値。Noneの場合はCSSとJavaScriptを埋め込む
+        messages_mode: "dom" はお知らせを全件HTMLとして出力し、"paged" はJSONとして
+            埋め込んでページ単位で描画する（件数が多くても読み込み時間が増えない）
+        page_size: "paged" の場合に1ページに表示するお知らせの件数
+        search_index: SearchIndex。指定した場合は新着分を索引に追加し、検索欄とともに埋め込む
+    """
     try:
         # 重複を排除し、期限順にソート
         from utils import deduplicate_assignments
         unique_assignments = deduplicate_assignments(assignments)
         
         logger.info(f"課題数: {len(unique_assignments)}")
-        logger.info(f"お知らせ数: {len(messages_with_subject)}")
+        logger.info(f"お知らせ数: {len(messages)}")
         
-        html = _get_html_template()
+        head, middle, tail = _get_template_parts(assets)
         
-        # 課題セクションの生成
-        assignments_html = _generate_assignments_html(unique_assignments)
+        paged = messages_mode == MESSAGES_MODE_PAGED
+        if fragment_cache is not None:
+            assignments_html, messages_html = _render_with_cache(
+                unique_assignments, messages, fragment_cache, logger,
+                include_messages=not paged
+            )
+        else:
+            assignments_html = _iter_assignments_html(unique_assignments)
+            messages_html = _iter_messages_html(messages)
+        if paged:
+            messages_html = _iter_messages_paged(messages, page_size)
+        if search_index is not None:
+            with METRICS.timer("search_index"):
+                added, removed = search_index.update(messages)
+            logger.info(f"検索インデックスを更新しました（追加: {added}件, 削除: {removed}件）")
         
+        yield head
+        # 課題セクションの生成
+        yield from assignments_html
+        yield middle
         # お知らせセクションの生成
-        messages_html = _generate_messages_html(messages_with_subject)
-        
-        # HTMLを組み立て
-        html = html.replace("{{ASSIGNMENTS}}", assignments_html)
-        html = html.replace("{{MESSAGES}}", messages_html)
-        
-        return html
+        if search_index is not None:
+            yield _MESSAGE_SEARCH_HTML
+        yield from messages_html
+        if search_index is not None:
+            yield from _iter_json_script("search-index", search_index.to_json())
+        yield tail
     except Exception as e:
         logger.error(f"HTML生成中にエラーが発生しました: {e}")
         raise
 
 
-def _generate_assignments_html(assignments):
-    """課題一覧のHTMLを生成"""
-    html = ""
+def _iter_assignments_html(assignments):
+    """課題一覧のHTMLを課題ごとに返す"""
+    now = datetime.now()
     for assignment in assignments:
-        due_date = assignment.get('availability_period_to', '')
-        urgency_class = calculate_urgency(due_date)
-        assignment_id = f"{assignment.get('subject', '')}_{assignment.get('name', '')}"
-        
-        html += f"""
+        yield _render_assignment(assignment, assignment.urgency(now))
+
+
+def _render_assignment(assignment, urgency_class):
+    """課題1件のHTML"""
+    return _ASSIGNMENT_TEMPLATE.format(
+        urgency_class=urgency_class,
+        assignment_id=assignment.id,
+        subject=escape(assignment.subject or ''),
+        name=escape(assignment.name or ''),
+        category=escape(assignment.category or ''),
+        due_date=escape(assignment.deadline_text),
+    )
+
+
+def _iter_messages_html(messages):
+    """お知らせ一覧のHTMLをお知らせごとに返す"""
+    # お知らせを科目名でソート
+    for message in sorted(messages, key=lambda x: x.subject or ''):
+        yield _render_message(message)
+
+
+def _render_message(message):
+    """お知らせ1件のHTML"""
+    return _MESSAGE_TEMPLATE.format(
+        message_id=message.id,
+        subject=escape(message.subject or ''),
+        message=escape(message.text or ''),
+    )
+
+
+def _iter_messages_paged(messages, page_size):
+    """お知らせをJSONとして埋め込み、ページ送りの操作部品とともに返す"""
+    subjects = []
+    subject_index = {}
+    records = []
+    for message in sorted(messages, key=lambda x: x.subject or ''):
+        subject = message.subject or ''
+        if subject not in subject_index:
+            subject_index[subject] = len(subjects)
+            subjects.append(subject)
+        records.append([subject_index[subject], message.id, message.text or ''])
+    data = json.dumps(
+        {"pageSize": page_size, "subjects": subjects, "messages": records},
+        ensure_ascii=False, separators=(",", ":")
+    )
+    yield _MESSAGE_PAGER_HTML
+    yield from _iter_json_script("messages-data", data)
+
+
+def _iter_json_script(element_id, data):
+    """JSONをページに埋め込むscript要素"""
+    # </script> などで埋め込みが途切れないよう < をエスケープする
+    yield f'<script type="application/json" id="{element_id}">'
+    yield data.replace("<", "\\u003c")
+    yield "</script>"
+
+
+def _render_with_cache(unique_assignments, messages, fragment_cache, logger,
+                       include_messages=True):
+    """講義ごとのHTML断片をキャッシュから取得し、変更のあった講義だけを生成し直す"""
+    # 課題は全体の期限順を保つため、講義ごとの断片を元の位置に戻して並べる
+    assignments_by_subject = {}
+    for index, assignment in enumerate(unique_assignments):
+        assignments_by_subject.setdefault(assignment.subject or '', []).append(
+            (index, assignment)
+        )
+    messages_by_subject = {}
+    for message in messages if include_messages else []:
+        messages_by_subject.setdefault(message.subject or '', []).append(message)
+    now = datetime.now()
+
+    assignment_cards = [None] * len(unique_assignments)
+    messages_html = []
+    rebuilt = 0
+    for subject in sorted(set(assignments_by_subject) | set(messages_by_subject)):
+        indexed_assignments = assignments_by_subject.get(subject, [])
+        course_assignments = [a for _, a in indexed_assignments]
+        course_messages = messages_by_subject.get(subject, [])
+        urgencies = [a.urgency(now) for a in course_assignments]
+        content_hash = _fragment_hash(course_assignments, urgencies, course_messages)
+        fragment = fragment_cache.get(subject, content_hash)
+        if fragment is None:
+            fragment = {
+                "assignments": [
+                    _render_assignment(a, urgency)
+                    for a, urgency in zip(course_assignments, urgencies)
+                ],
+                "messages": "".join(_render_message(m) for m in course_messages),
+            }
+            fragment_cache.put(subject, content_hash, fragment)
+            rebuilt += 1
+        for (index, _), card in zip(indexed_assignments, fragment["assignments"]):
+            assignment_cards[index] = card
+        messages_html.append(fragment["messages"])
+    logger.info(f"HTML断片を再生成した講義: {rebuilt}件")
+
+    return assignment_cards, messages_html
+
+
+# 断片のHTMLの形式を変えた場合は値を上げ、古い形式の断片を使わないようにする
+_FRAGMENT_VERSION = 2
+
+
+def _fragment_hash(assignments, urgencies, messages):
+    """講義ごとの課題・お知らせの内容から断片キャッシュのキーを作成"""
+    payload = json.dumps(
+        [
+            _FRAGMENT_VERSION,
+            [
+                [a.name, a.category, a.deadline_text, u]
+                for a, u in zip(assignments, urgencies)
+            ],
+            [[m.subject, m.text] for m in messages],
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FragmentCache:
+    """講義ごとに生成済みのHTML断片を保存するキャッシュ"""
+
+    def __init__(self, path=None):
+        """
+        初期化
+
+        Args:
+            path: キャッシュを保存するJSONファイル（Noneの場合はメモリ上のみ）
+        """
+        self.path = path
+        self._fragments = {}
+        self._used = set()
+        if path is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._fragments = json.load(f)
+            except (OSError, ValueError):
+                self._fragments = {}
+
+    def get(self, subject, content_hash):
+        """内容のハッシュが一致する断片を取得"""
+        self._used.add(subject)
+        entry = self._fragments.get(subject)
+        if entry is None or entry.get("hash") != content_hash:
+            return None
+        return entry["fragment"]
+
+    def put(self, subject, content_hash, fragment):
+        """断片を保存"""
+        self._used.add(subject)
+        self._fragments[subject] = {"hash": content_hash, "fragment": fragment}
+
+    def save(self):
+        """今回使った講義の断片だけをファイルに保存"""
+        if self.path is None:
+            return
+        fragments = {k: v for k, v in self._fragments.items() if k in self._used}
+        path = os.fspath(self.path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(fragments, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+_ASSIGNMENT_TEMPLATE = """
             <div class="assignment {urgency_class} uncompleted" data-assignment-id="{assignment_id}">
                 <input type="checkbox" class="checkbox assignment-checkbox">
-                <span class="subject">{assignment.get('subject', '')}</span>
-                <span class="title">{assignment.get('name', '')}</span>
-                <span class="category">{assignment.get('category', '')}</span>
+                <span class="subject">{subject}</span>
+                <span class="title">{name}</span>
+                <span class="category">{category}</span>
                 <div class="due-date">期限: {due_date}</div>
             </div>
         """
-    return html
-
 
-def _generate_messages_html(messages_with_subject):
-    """お知らせ一覧のHTMLを生成"""
-    # お知らせを科目名でソート
-    messages_with_subject.sort(key=lambda x: x[0])
-    
-    html = ""
-    for subject, message in messages_with_subject:
-        message_id = f"{subject}_{message}"
-        html += f"""
+_MESSAGE_TEMPLATE = """
             <div class="message" data-message-id="{message_id}">
                 <span class="message-subject">{subject}</span>
                 <div class="message-divider"></div>
                 <p class="message-content">{message}</p>
             </div>
         """
-    return html
 
+_MESSAGE_SEARCH_HTML = """
+            <div class="message-search-bar">
+                <input type="search" class="message-search" placeholder="お知らせを検索" aria-label="お知らせを検索">
+                <span class="message-search-info"></span>
+            </div>
+        """
 
-def _get_html_template():
-    """HTMLテンプレートを取得"""
-    return """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>WebClass情報</title>
-        <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+JP:wght@400;500;700&display=swap" rel="stylesheet">
-        <style>
-            :root {
+_MESSAGE_PAGER_HTML = """
+            <div class="message-pager">
+                <button type="button" class="pager-prev">前へ</button>
+                <span class="message-page-info"></span>
+                <button type="button" class="pager-next">次へ</button>
+                <select class="message-subject-jump">
+                    <option value="">科目へ移動</option>
+                </select>
+            </div>
+            <div class="message-page"></div>
+        """
+
+_TEMPLATE_PARTS = {}
+_ASSET_PREFIX = "webclass"
+
+
+def write_static_assets(output_dir):
+    """
+    CSSとJavaScriptを内容のハッシュ付きのファイル名で書き出す
+
+    同じ内容のファイルが既にあれば書き込まず、古いバージョンは削除する。
+
+    Returns:
+        {"css": CSSのファイル名, "js": JavaScriptのファイル名}
+    """
+    output_dir = os.fspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    assets = {}
+    for kind, content in (("css", _get_css()), ("js", _get_script())):
+        data = (textwrap.dedent(content).strip() + "\n").encode("utf-8")
+        version = hashlib.sha256(data).hexdigest()[:12]
+        name = f"{_ASSET_PREFIX}.{version}.{kind}"
+        path = os.path.join(output_dir, name)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        for old_name in os.listdir(output_dir):
+            if (old_name.startswith(f"{_ASSET_PREFIX}.") and old_name.endswith(f".{kind}")
+                    and old_name != name):
+                os.remove(os.path.join(output_dir, old_name))
+        assets[kind] = name
+    return assets
+
+
+def _assets_html(assets):
+    """CSS・JavaScriptの埋め込み（assetsがNoneの場合）または外部ファイルへのリンク"""
+    if assets is None:
+        return f"<style>\n{_get_css()}\n        </style>\n        <script>\n{_get_script()}\n        </script>"
+    return (
+        f'<link rel="stylesheet" href="{escape(assets["css"])}">\n'
+        f'        <script src="{escape(assets["js"])}" defer></script>'
+    )
+
+
+def _get_template_parts(assets=None):
+    """HTMLテンプレートを課題・お知らせの挿入位置で分割したもの（出力形式ごとに初回のみ分割する）"""
+    key = None if assets is None else (assets["css"], assets["js"])
+    if key not in _TEMPLATE_PARTS:
+        template = _get_html_template().replace("{{ASSETS}}", _assets_html(assets))
+        head, rest = template.split("{{ASSIGNMENTS}}")
+        middle, tail = rest.split("{{MESSAGES}}")
+        _TEMPLATE_PARTS[key] = (head, middle, tail)
+    return _TEMPLATE_PARTS[key]
+
+
+def _get_css():
+    """ページのCSS"""
+    return """            :root {
                 --md-sys-color-primary: #0061a4;
                 --md-sys-color-primary-container: #d1e4ff;
                 --md-sys-color-secondary: #535f70;
@@ -127,7 +492,7 @@ def _get_html_template():
             }
             
             body {
-                font-family: 'Noto Sans JP', sans-serif;
+                font-family: 'Noto Sans JP', 'Hiragino Kaku Gothic ProN', Meiryo, sans-serif;
                 background-color: var(--md-sys-color-surface-container-low);
                 color: var(--md-sys-color-on-surface);
                 line-height: 1.6;
@@ -337,6 +702,57 @@ def _get_html_template():
                 border-left: 4px solid var(--md-sys-color-primary);
             }
             
+            .message-search-bar {
+                display: flex;
+                align-items: center;
+                gap: 0.75rem;
+                margin-bottom: 1rem;
+            }
+            
+            .message-search {
+                flex: 1;
+                font: inherit;
+                padding: 0.5rem 1rem;
+                border: 1px solid var(--md-sys-color-outline-variant);
+                border-radius: 1.5rem;
+                background-color: var(--md-sys-color-surface);
+                color: var(--md-sys-color-on-surface);
+            }
+            
+            .message[hidden] {
+                display: none;
+            }
+            
+            .message-pager {
+                display: flex;
+                flex-wrap: wrap;
+                align-items: center;
+                gap: 0.75rem;
+                margin-bottom: 1rem;
+            }
+            
+            .message-pager button,
+            .message-pager select {
+                font: inherit;
+                padding: 0.25rem 0.75rem;
+                border: 1px solid var(--md-sys-color-outline-variant);
+                border-radius: 1rem;
+                background-color: var(--md-sys-color-surface);
+                color: var(--md-sys-color-on-surface);
+                cursor: pointer;
+            }
+            
+            .message-pager button:disabled {
+                opacity: 0.4;
+                cursor: default;
+            }
+            
+            .message-group-title {
+                color: var(--md-sys-color-secondary);
+                font-size: 1.1rem;
+                margin-top: 1.5rem;
+            }
+            
             @media (max-width: 768px) {
                 .container {
                     padding: 1rem;
@@ -357,16 +773,252 @@ def _get_html_template():
                 .assignment, .message {
                     padding: 1rem;
                 }
+            }"""
+
+
+def _get_script():
+    """ページのJavaScript"""
+    return """            // ページ内のカードを data 属性の値で1回だけ索引付けする
+            function indexCards(attribute) {
+                const index = new Map();
+                document.querySelectorAll(`[${attribute}]`).forEach(card => {
+                    index.set(card.getAttribute(attribute), card);
+                });
+                return index;
+            }
+
+            function loadStates(key) {
+                return JSON.parse(localStorage.getItem(key) || '{}');
+            }
+
+            function textOf(card, selector) {
+                const element = card.querySelector(selector);
+                return element ? element.textContent : '';
+            }
+
+            // 保存した状態のキーを現在のIDに合わせる。以前の版のID（「講義名_本文」）は
+            // buildLegacyIds() の対応表で現在のIDに移し替え、ページにないものは削除する。
+            // 一致するキーが1件もない場合（取得に失敗したページなど）は削除しない。
+            function reconcileStates(states, hasId, buildLegacyIds) {
+                let legacyIds = null;
+                let matched = false;
+                let changed = false;
+                const stale = [];
+                Object.keys(states).forEach(key => {
+                    if (hasId(key)) {
+                        matched = true;
+                        return;
+                    }
+                    legacyIds = legacyIds || buildLegacyIds();
+                    const id = legacyIds.get(key);
+                    if (id === undefined) {
+                        stale.push(key);
+                        return;
+                    }
+                    if (!(id in states)) {
+                        states[id] = states[key];
+                    }
+                    delete states[key];
+                    matched = true;
+                    changed = true;
+                });
+                if (matched && stale.length > 0) {
+                    stale.forEach(key => delete states[key]);
+                    changed = true;
+                }
+                return changed;
+            }
+
+            // お知らせのページ表示（messages-data がある場合のみ有効）
+            const messagePager = {
+                enabled: false,
+                all: [],
+                items: [],
+                page: 0,
+                pageSize: 50
+            };
+
+            function loadMessageData() {
+                const dataElement = document.getElementById('messages-data');
+                if (!dataElement) return false;
+                const data = JSON.parse(dataElement.textContent);
+                messagePager.all = data.messages.map(([subjectIndex, id, text]) => ({
+                    subject: data.subjects[subjectIndex],
+                    id: id,
+                    text: text
+                }));
+                messagePager.items = messagePager.all;
+                messagePager.pageSize = data.pageSize || messagePager.pageSize;
+
+                const jump = document.querySelector('.message-subject-jump');
+                if (jump) {
+                    data.subjects.forEach(subject => {
+                        const option = document.createElement('option');
+                        option.value = subject;
+                        option.textContent = subject;
+                        jump.appendChild(option);
+                    });
+                }
+                return true;
+            }
+
+            function createMessageCard(item, isRead) {
+                const card = document.createElement('div');
+                card.className = isRead ? 'message read' : 'message';
+                card.setAttribute('data-message-id', item.id);
+                const subject = document.createElement('span');
+                subject.className = 'message-subject';
+                subject.textContent = item.subject;
+                const divider = document.createElement('div');
+                divider.className = 'message-divider';
+                const content = document.createElement('p');
+                content.className = 'message-content';
+                content.textContent = item.text;
+                card.append(subject, divider, content);
+                return card;
+            }
+
+            // 表示中のページのお知らせだけをDOMに描画する
+            function renderMessagePage(page) {
+                const container = document.querySelector('.message-page');
+                if (!container) return;
+                const items = messagePager.items;
+                const pageCount = Math.max(1, Math.ceil(items.length / messagePager.pageSize));
+                messagePager.page = Math.min(Math.max(page, 0), pageCount - 1);
+                const start = messagePager.page * messagePager.pageSize;
+                const readMessages = loadStates('read_messages');
+
+                const fragment = document.createDocumentFragment();
+                let currentSubject = null;
+                items.slice(start, start + messagePager.pageSize).forEach(item => {
+                    if (item.subject !== currentSubject) {
+                        const title = document.createElement('h3');
+                        title.className = 'message-group-title';
+                        title.textContent = item.subject;
+                        fragment.appendChild(title);
+                        currentSubject = item.subject;
+                    }
+                    fragment.appendChild(createMessageCard(item, readMessages[item.id]));
+                });
+                container.replaceChildren(fragment);
+
+                document.querySelectorAll('.message-page-info').forEach(info => {
+                    info.textContent = `${messagePager.page + 1} / ${pageCount}（${items.length}件）`;
+                });
+                document.querySelectorAll('.pager-prev').forEach(button => {
+                    button.disabled = messagePager.page === 0;
+                });
+                document.querySelectorAll('.pager-next').forEach(button => {
+                    button.disabled = messagePager.page >= pageCount - 1;
+                });
+            }
+
+            function jumpToSubject(subject) {
+                const index = messagePager.items.findIndex(item => item.subject === subject);
+                if (index >= 0) {
+                    renderMessagePage(Math.floor(index / messagePager.pageSize));
+                }
+            }
+
+            // お知らせの全文検索（search-index がある場合のみ有効）
+            const messageSearch = {
+                n: 2,
+                docs: [],
+                postings: new Map()
+            };
+
+            function loadSearchIndex() {
+                const indexElement = document.getElementById('search-index');
+                if (!indexElement) return false;
+                const data = JSON.parse(indexElement.textContent);
+                messageSearch.n = data.n;
+                messageSearch.docs = data.docs;
+                messageSearch.postings = new Map(Object.entries(data.postings));
+                return true;
+            }
+
+            function normalizeText(text) {
+                return text.normalize('NFKC').toLowerCase();
+            }
+
+            // 索引で候補を絞り込み、本文との照合で確定したお知らせのIDを返す
+            function searchMessageIds(query, textOf) {
+                const normalized = normalizeText(query);
+                const n = messageSearch.n;
+                let candidates = null;
+                if (normalized.length < n) {
+                    candidates = new Set();
+                    messageSearch.postings.forEach((docs, gram) => {
+                        if (gram.includes(normalized)) {
+                            docs.forEach(doc => candidates.add(doc));
+                        }
+                    });
+                } else {
+                    for (let i = 0; i + n <= normalized.length; i++) {
+                        const gram = normalized.slice(i, i + n);
+                        if (/\s/.test(gram)) continue;
+                        const docs = new Set(messageSearch.postings.get(gram) || []);
+                        candidates = candidates === null
+                            ? docs
+                            : new Set([...candidates].filter(doc => docs.has(doc)));
+                        if (candidates.size === 0) break;
+                    }
+                }
+                const ids = new Set();
+                (candidates || []).forEach(doc => {
+                    const id = messageSearch.docs[doc];
+                    const text = textOf(id);
+                    if (text !== null && normalizeText(text).includes(normalized)) {
+                        ids.add(id);
+                    }
+                });
+                return ids;
             }
-        </style>
-        <script>
+
+            function applyMessageSearch(query) {
+                const info = document.querySelector('.message-search-info');
+                if (messagePager.enabled) {
+                    if (query.trim() === '') {
+                        messagePager.items = messagePager.all;
+                    } else {
+                        const texts = new Map(messagePager.all.map(item => [
+                            item.id, `${item.subject}\n${item.text}`
+                        ]));
+                        const ids = searchMessageIds(query, id => texts.get(id) ?? null);
+                        messagePager.items = messagePager.all.filter(item => ids.has(item.id));
+                    }
+                    renderMessagePage(0);
+                    if (info) {
+                        info.textContent = query.trim() === '' ? '' : `${messagePager.items.length}件`;
+                    }
+                    return;
+                }
+                const messageCards = indexCards('data-message-id');
+                if (query.trim() === '') {
+                    messageCards.forEach(card => { card.hidden = false; });
+                    if (info) info.textContent = '';
+                    return;
+                }
+                const ids = searchMessageIds(query, id => {
+                    const card = messageCards.get(id);
+                    if (!card) return null;
+                    const subject = card.querySelector('.message-subject').textContent;
+                    const content = card.querySelector('.message-content').textContent;
+                    return `${subject}\n${content}`;
+                });
+                messageCards.forEach((card, id) => { card.hidden = !ids.has(id); });
+                if (info) info.textContent = `${ids.size}件`;
+            }
+
+            let assignmentCards = new Map();
+
             // 課題の状態を保存する関数
             function saveState(assignmentId, isCompleted) {
-                const states = JSON.parse(localStorage.getItem('assignment_states') || '{}');
+                const states = loadStates('assignment_states');
                 states[assignmentId] = isCompleted;
                 localStorage.setItem('assignment_states', JSON.stringify(states));
                 
-                const card = document.querySelector(`[data-assignment-id="${assignmentId}"]`);
+                const card = assignmentCards.get(assignmentId);
                 if (card) {
                     card.classList.toggle('completed', isCompleted);
                     card.classList.toggle('uncompleted', !isCompleted);
@@ -375,18 +1027,30 @@ def _get_html_template():
                 sortAssignments();
             }
 
-            // 課題の状態を復元する関数
+            // 課題の状態を復元する関数（ページにない課題の状態は削除する）
             function restoreStates() {
-                const states = JSON.parse(localStorage.getItem('assignment_states') || '{}');
+                assignmentCards = indexCards('data-assignment-id');
+                const states = loadStates('assignment_states');
+                const changed = reconcileStates(states, id => assignmentCards.has(id), () => {
+                    const legacyIds = new Map();
+                    assignmentCards.forEach((card, id) => {
+                        legacyIds.set(`${textOf(card, '.subject')}_${textOf(card, '.title')}`, id);
+                    });
+                    return legacyIds;
+                });
+                if (changed) {
+                    localStorage.setItem('assignment_states', JSON.stringify(states));
+                }
                 Object.entries(states).forEach(([assignmentId, isCompleted]) => {
-                    const card = document.querySelector(`[data-assignment-id="${assignmentId}"]`);
-                    if (card) {
-                        card.classList.toggle('completed', isCompleted);
-                        card.classList.toggle('uncompleted', !isCompleted);
-                        const checkbox = card.querySelector('.assignment-checkbox');
-                        if (checkbox) {
-                            checkbox.checked = isCompleted;
-                        }
+                    const card = assignmentCards.get(assignmentId);
+                    if (!card) {
+                        return;
+                    }
+                    card.classList.toggle('completed', isCompleted);
+                    card.classList.toggle('uncompleted', !isCompleted);
+                    const checkbox = card.querySelector('.assignment-checkbox');
+                    if (checkbox) {
+                        checkbox.checked = isCompleted;
                     }
                 });
                 
@@ -398,49 +1062,75 @@ def _get_html_template():
                 const container = document.querySelector('.assignments');
                 if (!container) return;
                 
-                const assignments = Array.from(container.children);
+                const assignments = Array.from(container.children).map(card => ({
+                    card: card,
+                    completed: card.classList.contains('completed'),
+                    dueDate: card.querySelector('.due-date').textContent
+                }));
                 
                 assignments.sort((a, b) => {
-                    const aCompleted = a.classList.contains('completed');
-                    const bCompleted = b.classList.contains('completed');
-                    
-                    if (aCompleted === bCompleted) {
-                        const aDueDate = a.querySelector('.due-date').textContent;
-                        const bDueDate = b.querySelector('.due-date').textContent;
-                        return aDueDate.localeCompare(bDueDate);
+                    if (a.completed === b.completed) {
+                        return a.dueDate.localeCompare(b.dueDate);
                     }
-                    
-                    return aCompleted ? 1 : -1;
+                    return a.completed ? 1 : -1;
                 });
                 
-                assignments.forEach(assignment => container.appendChild(assignment));
+                assignments.forEach(assignment => container.appendChild(assignment.card));
             }
 
             // お知らせの未読状態を管理する関数
-            function markMessageAsRead(messageId) {
-                const readMessages = JSON.parse(localStorage.getItem('read_messages') || '{}');
-                readMessages[messageId] = true;
-                localStorage.setItem('read_messages', JSON.stringify(readMessages));
-                
-                const card = document.querySelector(`[data-message-id="${messageId}"]`);
+            function markMessageAsRead(messageId, card) {
+                const readMessages = loadStates('read_messages');
+                if (!readMessages[messageId]) {
+                    readMessages[messageId] = true;
+                    localStorage.setItem('read_messages', JSON.stringify(readMessages));
+                }
                 if (card) {
                     card.classList.add('read');
                 }
             }
 
-            // お知らせの状態を復元する関数
+            // お知らせの状態を復元する関数（ページにないお知らせの既読状態は削除する）
             function restoreMessageStates() {
-                const readMessages = JSON.parse(localStorage.getItem('read_messages') || '{}');
-                document.querySelectorAll('.message').forEach(card => {
-                    const messageId = card.getAttribute('data-message-id');
-                    if (readMessages[messageId]) {
-                        card.classList.add('read');
+                const readMessages = loadStates('read_messages');
+                const messageCards = messagePager.enabled ? null : indexCards('data-message-id');
+                const knownIds = messagePager.enabled
+                    ? new Set(messagePager.all.map(item => item.id))
+                    : messageCards;
+                const changed = reconcileStates(readMessages, id => knownIds.has(id), () => {
+                    const legacyIds = new Map();
+                    if (messageCards) {
+                        messageCards.forEach((card, id) => {
+                            const subject = textOf(card, '.message-subject');
+                            legacyIds.set(`${subject}_${textOf(card, '.message-content')}`, id);
+                        });
+                    } else {
+                        messagePager.all.forEach(item => {
+                            legacyIds.set(`${item.subject}_${item.text}`, item.id);
+                        });
                     }
+                    return legacyIds;
                 });
+                if (changed) {
+                    localStorage.setItem('read_messages', JSON.stringify(readMessages));
+                }
+                if (messageCards) {
+                    Object.keys(readMessages).forEach(messageId => {
+                        const card = messageCards.get(messageId);
+                        if (card) {
+                            card.classList.add('read');
+                        }
+                    });
+                }
+                if (messagePager.enabled) {
+                    renderMessagePage(0);
+                }
             }
 
             // ページ読み込み時に状態を復元
             document.addEventListener('DOMContentLoaded', function() {
+                messagePager.enabled = loadMessageData();
+                loadSearchIndex();
                 restoreStates();
                 restoreMessageStates();
             });
@@ -451,18 +1141,50 @@ def _get_html_template():
                     const card = e.target.closest('.assignment');
                     const assignmentId = card.getAttribute('data-assignment-id');
                     saveState(assignmentId, e.target.checked);
+                } else if (e.target.classList.contains('message-subject-jump')) {
+                    jumpToSubject(e.target.value);
+                }
+            });
+
+            // お知らせの検索欄への入力を監視
+            document.addEventListener('input', function(e) {
+                if (e.target.classList.contains('message-search')) {
+                    applyMessageSearch(e.target.value);
                 }
             });
 
             // メッセージのクリックを監視
             document.addEventListener('click', function(e) {
+                if (e.target.closest('.pager-prev')) {
+                    renderMessagePage(messagePager.page - 1);
+                    return;
+                }
+                if (e.target.closest('.pager-next')) {
+                    renderMessagePage(messagePager.page + 1);
+                    return;
+                }
                 const messageCard = e.target.closest('.message');
                 if (messageCard) {
                     const messageId = messageCard.getAttribute('data-message-id');
-                    markMessageAsRead(messageId);
+                    markMessageAsRead(messageId, messageCard);
                 }
-            });
-        </script>
+            });"""
+
+
+def _get_html_template():
+    """HTMLテンプレートを取得"""
+    return """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>WebClass情報</title>
+        <link rel="preconnect" href="https://fonts.googleapis.com">
+        <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+        <!-- Webフォントは読み込みを待たずに表示し、取得できない場合はシステムフォントを使う -->
+        <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+JP:wght@400;500;700&display=swap" rel="stylesheet" media="print" onload="this.media='all'">
+        {{ASSETS}}
     </head>
     <body>
         <div class="header">
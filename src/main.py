@@ -1,73 +1,151 @@
 """
 WebClassクライアント メインスクリプト
 """
+import argparse
 import sys
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 
 # ローカルモジュールのインポート
-from webclass_client import WebClassClient
+from webclass_client import PollScheduler, RequestBudget, TokenBucket, WebClassClient
+from webclass_client.daemon import watch
+from webclass_client.metrics import METRICS, profile_run
 from webclass_client.logger_setup import setup_logger
 from config import (
     WEBCLASS_URL, OUTPUT_DIR, LOG_FILE, HTML_OUTPUT_FILE, 
-    DEBUG_LOG_FILE, DEFAULT_DATE
+    DEBUG_LOG_FILE, DEFAULT_DATE, MAX_WORKERS, SESSION_CACHE_FILE,
+    RESPONSE_CACHE_FILE, RESPONSE_CACHE_MAX_ENTRIES, MESSAGE_STORE_FILE, STORE_FILE,
+    HTML_PARSER, HTML_FRAGMENT_CACHE_FILE, HTML_EXTERNAL_ASSETS,
+    HTML_MESSAGES_MODE, HTML_MESSAGES_PAGE_SIZE, HTML_SEARCH_INDEX_FILE,
+    REQUEST_BUDGET_FILE, REQUEST_BUDGET_PER_DAY, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL,
+    POLL_BACKOFF, POLL_DEADLINE_POLLS, CATALOG_REFRESH_INTERVAL,
+    BATCH_OUTPUT_DIR, BATCH_MAX_CONCURRENCY, BATCH_WORKERS_PER_ACCOUNT, BATCH_USE_PROCESSES,
+    HTTP_POOL_SIZE, HTTP_TIMEOUT, HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF, HTTP_RATE_LIMIT,
+    HTTP_RATE_BURST, METRICS_FILE, METRICS_PROMETHEUS_FILE, PROFILE_DIR
 )
-from utils import (
-    check_execution_limit, load_env_credentials, 
-    create_output_directory
-)
-from html_generator import generate_html
+from utils import load_env_credentials, create_output_directory
+from html_generator import FragmentCache, write_snapshots_html
+from search_index import SearchIndex
+from batch import load_accounts, run_batch
 
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="WebClassの課題・お知らせを取得してHTMLを生成します")
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="ログインしたまま常駐し、講義ごとに間隔を調整しながら取得し直す"
+    )
+    parser.add_argument(
+        "--accounts", metavar="FILE",
+        help="アカウントファイル（JSON）に記載した全アカウントを並列に処理する"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="cProfileとtracemallocの結果を output/profile/ に保存する（講義は逐次取得する）"
+    )
+    capture = parser.add_mutually_exclusive_group()
+    capture.add_argument(
+        "--record", metavar="DIR",
+        help="送受信したリクエストとレスポンスをすべて DIR に記録する"
+    )
+    capture.add_argument(
+        "--replay", metavar="DIR",
+        help="ネットワークに接続せず、--record で記録したレスポンスを使って実行する"
+    )
+    args = parser.parse_args()
+    if args.accounts and (args.record or args.replay):
+        parser.error("--record / --replay は --accounts と同時に指定できません")
+    if args.accounts and args.profile:
+        parser.error("--profile は --accounts と同時に指定できません")
+
     # ロガーの設定
     logger = setup_logger(__name__, log_file=LOG_FILE)
+
+    with profile_run(PROFILE_DIR, logger) if args.profile else nullcontext():
+        try:
+            if args.accounts:
+                sys.exit(run_accounts(args.accounts, logger))
+            run(args, logger)
+        finally:
+            write_metrics(logger)
+
+
+def run(args, logger):
+    """1アカウント分の取得とHTML生成（--daemon の場合は常駐）"""
+    budget = RequestBudget(REQUEST_BUDGET_PER_DAY, REQUEST_BUDGET_FILE)
+    # 記録・再生では毎回同じリクエストを送るよう、前回の実行を引き継ぐキャッシュを使わない
+    capturing = bool(args.record or args.replay)
     
     try:
         # 出力ディレクトリの作成
         create_output_directory()
         
-        # 実行制限のチェック
-        check_execution_limit(logger)
-        
-        # 認証情報の読み込み
-        try:
-            username, password = load_env_credentials()
-        except ValueError as e:
-            logger.error(str(e))
-            print("エラー: 環境変数が設定されていません。")
-            print(".envファイルを確認してください。")
+        # リクエスト予算のチェック（再生時はネットワークに接続しないため不要）
+        if not args.replay and not budget.can_afford(1):
+            logger.warning("本日のリクエスト数が上限に達しています")
+            print("エラー: 本日のリクエスト数が上限に達しています。")
+            print("次回の実行は明日以降にしてください。")
             sys.exit(1)
+        
+        # 認証情報の読み込み（記録にはログイン情報を含めないため、再生時は任意の値でよい）
+        if args.replay:
+            username, password = "replay", "replay"
+        else:
+            try:
+                username, password = load_env_credentials()
+            except ValueError as e:
+                logger.error(str(e))
+                print("エラー: 環境変数が設定されていません。")
+                print(".envファイルを確認してください。")
+                sys.exit(1)
 
         # WebClassクライアントの初期化とログイン
-        with WebClassClient(WEBCLASS_URL, debug_mode=False) as client:
+        # cProfileは呼び出したスレッドしか計測しないため、プロファイル時は講義を逐次取得する
+        with WebClassClient(
+            WEBCLASS_URL, debug_mode=False, max_workers=1 if args.profile else MAX_WORKERS,
+            session_cache_file=None if capturing else SESSION_CACHE_FILE,
+            response_cache_file=None if capturing else RESPONSE_CACHE_FILE,
+            response_cache_size=RESPONSE_CACHE_MAX_ENTRIES,
+            message_store_file=None if capturing else MESSAGE_STORE_FILE,
+            store_file=None if args.replay else STORE_FILE,
+            parser=HTML_PARSER,
+            request_budget=None if args.replay else budget,
+            pool_size=HTTP_POOL_SIZE,
+            timeout=HTTP_TIMEOUT,
+            max_retries=HTTP_MAX_RETRIES,
+            retry_backoff=HTTP_RETRY_BACKOFF,
+            rate_limiter=(
+                TokenBucket(HTTP_RATE_LIMIT, HTTP_RATE_BURST)
+                if HTTP_RATE_LIMIT and not args.replay else None
+            ),
+            record_dir=args.record,
+            replay_dir=args.replay
+        ) as client:
             client.set_login_info(username, password)
         
-            if not client.login():
+            with METRICS.timer("login"):
+                logged_in = client.login()
+            if not logged_in:
                 logger.error("ログインに失敗しました")
                 print("ログインに失敗しました。")
                 sys.exit(1)
             
             logger.info("WebClassへのログインが完了しました")
             
-            # データの取得
-            logger.info("課題情報を取得中...")
-            assignment_info = client.get_assignment_info(datetime.now())
-            logger.info(f"課題情報を取得しました: {len(assignment_info)}件")
-
-            logger.info("お知らせ情報を取得中...")
-            messages_with_subject = get_all_messages(client)
-            logger.info(f"お知らせを取得しました: {len(messages_with_subject)}件")
-            
-            # HTML生成と保存
-            logger.info("HTMLファイルを生成中...")
-            html_content = generate_html(assignment_info, messages_with_subject, logger)
-            
-            with open(HTML_OUTPUT_FILE, "w", encoding="utf-8") as f:
-                f.write(html_content)
+            fragment_cache = FragmentCache(HTML_FRAGMENT_CACHE_FILE)
+            search_index = SearchIndex(HTML_SEARCH_INDEX_FILE) if HTML_SEARCH_INDEX_FILE else None
+
+            if args.daemon:
+                run_daemon(client, budget, fragment_cache, search_index, logger)
+                return
 
-            logger.info(f"HTMLファイルを生成しました: {HTML_OUTPUT_FILE}")
+            # データの取得（各講義に1回だけアクセスして課題とお知らせをまとめて取得）
+            logger.info("課題・お知らせ情報を取得中...")
+            with METRICS.timer("crawl"):
+                snapshots = client.crawl(datetime.now(), DEFAULT_DATE)
+            write_outputs(snapshots, fragment_cache, search_index, logger)
             print("HTMLファイルの生成が完了しました。")
             print(f"出力先: {HTML_OUTPUT_FILE}")
 
@@ -80,31 +158,73 @@ def main():
         print("エラーが発生しました。")
         print("詳細はログファイルを確認してください。")
         sys.exit(1)
+    finally:
+        budget.save()
 
 
-def get_all_messages(client):
-    """全講義のメッセージを取得する"""
-    messages_with_subject = []
-    
+def run_accounts(accounts_file, logger):
+    """アカウントファイルの全アカウントを処理し、終了コードを返す"""
     try:
-        lecture_ids = client.get_lecture_id_list()
-        
-        for lecture_id in lecture_ids:
-            try:
-                subject = client.get_lecture_name(lecture_id)
-                messages = client.get_lecture_message(lecture_id, DEFAULT_DATE)
-                for message in messages:
-                    messages_with_subject.append((subject, message))
-            except Exception as e:
-                # 個別の講義で失敗しても続行
-                client.logger.warning(f"講義ID {lecture_id} のメッセージ取得に失敗: {e}")
-                continue
-                
-    except Exception as e:
-        client.logger.error(f"講義メッセージの取得中にエラーが発生しました: {e}")
-        raise
-    
-    return messages_with_subject
+        accounts = load_accounts(accounts_file)
+    except (OSError, ValueError) as e:
+        logger.error(f"アカウントファイルの読み込みに失敗しました: {e}")
+        print("エラー: アカウントファイルを読み込めませんでした。")
+        return 1
+    try:
+        results = run_batch(
+            accounts, BATCH_OUTPUT_DIR, logger, BATCH_MAX_CONCURRENCY,
+            BATCH_WORKERS_PER_ACCOUNT, BATCH_USE_PROCESSES
+        )
+    except KeyboardInterrupt:
+        logger.info("ユーザーによって処理が中断されました")
+        print("\n処理が中断されました。")
+        return 0
+    failed = sum(1 for result in results if not result["ok"])
+    print(f"{len(results)}件のアカウントを処理しました（失敗: {failed}件）")
+    print(f"出力先: {BATCH_OUTPUT_DIR}")
+    return 1 if failed else 0
+
+
+def write_metrics(logger):
+    """計測結果をJSONとPrometheusのtextfile形式で保存する"""
+    try:
+        METRICS.write_json(METRICS_FILE)
+        METRICS.write_prometheus(METRICS_PROMETHEUS_FILE)
+    except OSError as e:
+        logger.warning(f"計測結果の保存に失敗しました: {e}")
+        return
+    summary = METRICS.summary()
+    logger.info(
+        f"リクエスト: {summary['total_requests']}件, {summary['total_bytes'] / 1024:.1f} KiB"
+        f"（計測結果: {METRICS_FILE}）"
+    )
+
+
+def write_outputs(snapshots, fragment_cache, search_index, logger):
+    """取得結果からHTMLを生成して保存する"""
+    write_snapshots_html(
+        snapshots, logger, HTML_OUTPUT_FILE, fragment_cache, search_index,
+        HTML_EXTERNAL_ASSETS, HTML_MESSAGES_MODE, HTML_MESSAGES_PAGE_SIZE
+    )
+
+
+def run_daemon(client, budget, fragment_cache, search_index, logger):
+    """常駐して講義ごとに取得し直し、変更があるたびにHTMLを更新する"""
+    scheduler = PollScheduler(
+        POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_BACKOFF, POLL_DEADLINE_POLLS
+    )
+    logger.info("常駐モードを開始します")
+    print("常駐モードで実行中です（Ctrl+Cで終了）")
+    print(f"出力先: {HTML_OUTPUT_FILE}")
+
+    def on_update(snapshots):
+        write_outputs(snapshots, fragment_cache, search_index, logger)
+        write_metrics(logger)
+
+    watch(
+        client, scheduler, on_update, logger, message_date=DEFAULT_DATE, catalog_interval=CATALOG_REFRESH_INTERVAL,
+        budget=budget
+    )
 
 
 if __name__ == "__main__":
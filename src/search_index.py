@@ -0,0 +1,146 @@
+"""
+お知らせの全文検索インデックス
+"""
+import json
+import os
+import unicodedata
+
+
+# 日本語は単語に区切れないため、文字の2-gramで索引付けする
+NGRAM_SIZE = 2
+_INDEX_VERSION = 1
+
+
+def normalize_text(text):
+    """全角・半角や大文字・小文字の違いを吸収した検索用の文字列に変換"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """正規化した文字列の n-gram の集合（空白を含むものは除く）"""
+    text = normalize_text(text)
+    if len(text) < n:
+        return {text} if text.strip() else set()
+    grams = set()
+    for i in range(len(text) - n + 1):
+        gram = text[i:i + n]
+        if not any(c.isspace() for c in gram):
+            grams.add(gram)
+    return grams
+
+
+class SearchIndex:
+    """
+    お知らせの本文と講義名に対する転置インデックス
+
+    前回の実行で索引付けしたお知らせはファイルから読み込み、新しく現れた
+    お知らせだけを分割して追加する。ページから消えたお知らせは取り除く。
+    """
+
+    def __init__(self, path=None):
+        """
+        初期化
+
+        Args:
+            path: インデックスを保存するJSONファイル（Noneの場合はメモリ上のみ）
+        """
+        self.path = path
+        self._postings = {}
+        self._docs = set()
+        self._dirty = False
+        if path is not None:
+            self._load()
+
+    def update(self, messages):
+        """
+        お知らせ（Message）の一覧にインデックスを合わせる
+
+        Returns:
+            (追加したお知らせの件数, 削除したお知らせの件数)
+        """
+        current = {message.id: message for message in messages}
+
+        removed = self._docs - current.keys()
+        if removed:
+            for gram in list(self._postings):
+                docs = [doc for doc in self._postings[gram] if doc not in removed]
+                if docs:
+                    self._postings[gram] = docs
+                else:
+                    del self._postings[gram]
+            self._docs -= removed
+
+        added = 0
+        for doc_id, message in current.items():
+            if doc_id in self._docs:
+                continue
+            for gram in ngrams(f"{message.subject or ''}\n{message.text or ''}"):
+                self._postings.setdefault(gram, []).append(doc_id)
+            self._docs.add(doc_id)
+            added += 1
+
+        if added or removed:
+            self._dirty = True
+        return added, len(removed)
+
+    def search(self, query):
+        """クエリのすべての n-gram を含むお知らせのIDを返す（候補の絞り込み用）"""
+        grams = ngrams(query)
+        if not grams:
+            return set()
+        result = None
+        for gram in grams:
+            docs = set(self._postings.get(gram, ()))
+            result = docs if result is None else result & docs
+            if not result:
+                break
+        return result
+
+    def to_json(self):
+        """
+        ページに埋め込む形式のJSONを返す
+
+        お知らせのIDは "docs" に1回だけ出現させ、転置リストはその添字で表す。
+        """
+        docs = sorted(self._docs)
+        position = {doc_id: i for i, doc_id in enumerate(docs)}
+        postings = {
+            gram: sorted(position[doc_id] for doc_id in doc_ids)
+            for gram, doc_ids in sorted(self._postings.items())
+        }
+        return json.dumps(
+            {"n": NGRAM_SIZE, "docs": docs, "postings": postings},
+            ensure_ascii=False, separators=(",", ":")
+        )
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != _INDEX_VERSION or data.get("n") != NGRAM_SIZE:
+            return
+        self._postings = data.get("postings", {})
+        self._docs = set(data.get("docs", []))
+
+    def save(self):
+        """変更があればファイルに保存"""
+        if self.path is None or not self._dirty:
+            return
+        data = {
+            "version": _INDEX_VERSION,
+            "n": NGRAM_SIZE,
+            "docs": sorted(self._docs),
+            "postings": self._postings,
+        }
+        path = os.fspath(self.path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        self._dirty = False
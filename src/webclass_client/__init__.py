@@ -1,3 +1,19 @@
 from .client import WebClassClient
+from .catalog import CourseCatalog
+from .store import WebClassStore
+from .budget import RequestBudget
+from .scheduler import PollScheduler
+from .transport import TokenBucket
+from .models import Assignment, Course, Message
+from .lectures import ItemFilter
 
-__all__ = ['WebClassClient']
\ No newline at end of file
+__all__ = [
+    'WebClassClient', 'CourseCatalog', 'WebClassStore', 'RequestBudget', 'PollScheduler',
+    'TokenBucket', 'Assignment', 'Course', 'Message', 'ItemFilter',
+]
+
+try:
+    from .async_client import AsyncWebClassClient
+    __all__.append('AsyncWebClassClient')
+except ImportError:  # aiohttp未インストール時は同期版のみ提供
+    pass
@@ -1,32 +1,47 @@
-from datetime import datetime
-from .lectures import get_lecture_name, get_lecture_info, get_lecture_id_list
+from .crawler import crawl_courses
+from .lectures import DEFAULT_PARSER, ItemFilter, get_course_catalog, get_lecture_info
 
-def get_assignment_info(url, acs, cookie, session, date, logger):
-    lecture_id_list = get_lecture_id_list(url, acs, cookie, session, logger)
+# 課題として扱わないカテゴリ
+NON_ASSIGNMENT_CATEGORIES = ("資料",)
+
+def assignment_filter(date_obj):
+    """
+    extract_assignments() で必ず除かれる項目を解析の段階で読み飛ばす ItemFilter
+
+    期限切れの項目と資料だけを除き、受付開始前の項目は残す。時刻が進むほど
+    条件が厳しくなるだけなので、前回の実行でキャッシュした解析結果を再利用できる。
+    """
+    return ItemFilter(exclude_categories=NON_ASSIGNMENT_CATEGORIES, not_before=date_obj)
+
+def get_assignment_info(url, acs, cookie, session, date, logger, catalog=None, max_workers=1, cache=None,
+                        parser=DEFAULT_PARSER):
+    if catalog is None:
+        catalog = get_course_catalog(url, acs, cookie, session, logger, parser)
+    lecture_id_list = catalog.ids() if catalog is not None else []
     if not lecture_id_list:
         logger.error("lecture not found")
         return []
+    # 講義ページの日時は分単位のため、判定に使う日時も分単位に切り捨てる
+    date_obj = date.replace(second=0, microsecond=0)
+
+    def fetch(lecture_id):
+        course_acs = {"acs_": catalog.acs(lecture_id) or acs["acs_"]}
+        lecture_info = get_lecture_info(
+            url, lecture_id, course_acs, cookie, session, logger, cache, parser,
+            assignment_filter(date_obj)
+        )
+        return extract_assignments(lecture_info, catalog.name(lecture_id), date_obj, logger)
+
     assignment_info = []
-    date_format = "%Y/%m/%d %H:%M"
-    date_obj = datetime.strptime(date.strftime(date_format), date_format)
-    for lecture_id in lecture_id_list:
-        lecture_name = get_lecture_name(url, lecture_id, acs, cookie, session, logger)
-        lecture_info = get_lecture_info(url, lecture_id, acs, cookie, session, logger)
-        for section in lecture_info:
-            for key in lecture_info[section]:
-                item = lecture_info[section][key]
-                start = item.get("availability_period_from")
-                deadline = item.get("availability_period_to")
-                if not start or not deadline:
-                    continue
-                try:
-                    start_dt = datetime.strptime(start, date_format)
-                    deadline_dt = datetime.strptime(deadline, date_format)
-                except Exception as e:
-                    logger.error(f"Error parsing dates: {e}")
-                    continue
-                if deadline_dt > date_obj > start_dt and item["category"] not in ["資料"]:
-                    item["subject"] = lecture_name
-                    assignment_info.append(item)
+    for _, assignments in crawl_courses(lecture_id_list, fetch, max_workers, logger):
+        assignment_info.extend(assignments)
     logger.info(f"found {len(assignment_info)} assignments")
-    return assignment_info
\ No newline at end of file
+    return assignment_info
+
+def extract_assignments(lecture_info, lecture_name, date_obj, logger):
+    """講義ページの項目から date_obj の時点で受付中の課題（資料を除く）を講義名付きで返す"""
+    return [
+        item.with_subject(lecture_name)
+        for item in lecture_info
+        if item.is_open(date_obj) and item.category not in NON_ASSIGNMENT_CATEGORIES
+    ]
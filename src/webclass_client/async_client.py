@@ -0,0 +1,325 @@
+"""
+WebClassクライアントのasyncio版
+"""
+import asyncio
+import functools
+import json
+from datetime import datetime
+
+import aiohttp
+
+from .logger_setup import setup_logger
+from .lectures import (
+    DEFAULT_PARSER, parse_acs, parse_course_catalog, parse_lecture_info, resolve_parser
+)
+from .assignments import assignment_filter, extract_assignments
+from .decoding import response_charset
+from .messages import messages_url, parse_lecture_messages
+from .models import Message
+
+
+class AsyncWebClassClient:
+    """WebClassとの通信を1つのイベントループ上で行うクライアントクラス"""
+
+    def __init__(self, url, debug_mode=False, max_connections=10, parser=DEFAULT_PARSER):
+        """
+        初期化
+
+        Args:
+            url: WebClassのURL
+            debug_mode: デバッグモード
+            max_connections: 共有コネクションプールの最大接続数
+            parser: HTML解析に使うBeautifulSoupのパーサー（"html.parser" / "lxml" など）
+        """
+        self.url = url
+        self.login_info = {"username": "", "val": ""}
+        self.session = None
+        self.acs = {"acs_": "12345678"}
+        self.cookie = None
+        self.catalog = None
+        self.debug_mode = debug_mode
+        self.max_connections = max_connections
+        self.logger = setup_logger(__name__, debug_mode=debug_mode)
+        self.parser = resolve_parser(parser, self.logger)
+        self._is_logged_in = False
+
+    def _get_session(self):
+        """共有のaiohttpセッションを取得（未作成なら作成）"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    def set_login_info(self, username, password):
+        """ログイン情報を設定"""
+        if not username or not password:
+            raise ValueError("ユーザー名とパスワードは必須です")
+
+        self.login_info["username"] = username
+        self.login_info["val"] = password
+
+    def set_wbt_session(self, wbt_session):
+        """WBTセッションを設定"""
+        self.cookie = {"WBT_Session": wbt_session}
+        self.logger.info("set wbt_session success")
+
+    async def login(self):
+        """ログイン処理"""
+        if not self.login_info.get("username") or not self.login_info.get("val"):
+            self.logger.error("Username or Password are unset")
+            return False
+        try:
+            session = self._get_session()
+            acs_url = f"{self.url}/webclass/login.php"
+            async with session.post(acs_url, data=self.login_info) as response:
+                text = await response.read()
+                wbt_session = response.cookies.get("WBT_Session")
+            self.acs = {"acs_": parse_acs(text)}
+            self.cookie = {"WBT_Session": wbt_session.value if wbt_session else None}
+            self._is_logged_in = True
+            self.logger.info("ログインに成功しました")
+            return True
+        except Exception as e:
+            self.logger.error(f"ログイン処理中にエラーが発生しました: {e}")
+            return False
+
+    async def logout(self):
+        """ログアウト処理"""
+        if self.cookie is None:
+            self.logger.error("did not login")
+            return False
+        try:
+            logout_url = f"{self.url}/webclass/logout.php"
+            async with self._get_session().get(logout_url, cookies=self.cookie) as response:
+                await response.read()
+            self._is_logged_in = False
+            self.catalog = None
+            self.cookie = None
+            self.logger.info("ログアウトしました")
+            return True
+        except Exception as e:
+            self.logger.error(f"ログアウト処理中にエラーが発生しました: {e}")
+            return False
+
+    async def close(self):
+        """コネクションプールを閉じる"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    def _check_login_status(self):
+        """ログイン状態をチェック"""
+        if not self._is_logged_in:
+            raise RuntimeError("ログインしていません。先にlogin()を呼び出してください。")
+
+    async def _get_markup(self, method, url, data=None):
+        """リクエストを送信し、(本文のバイト列, 文字コード) を返す（本文はデコードしない）"""
+        async with self._get_session().request(
+            method, url, data=data, cookies=self.cookie
+        ) as response:
+            body = await response.read()
+            return body, response_charset(url, response.headers.get("Content-Type"))
+
+    async def _course_login(self, lecture_id):
+        """講義にログインし、その講義専用のacsを返す"""
+        catalog = await self.get_course_catalog()
+        token = catalog.acs(lecture_id) if catalog is not None else None
+        acs = {"acs_": token or self.acs["acs_"]}
+        login_url = f"{self.url}/webclass/course.php/{lecture_id}/login?acs_={acs['acs_']}"
+        body, _ = await self._get_markup("POST", login_url, data=acs)
+        return {"acs_": parse_acs(body)}
+
+    async def get_course_catalog(self, refresh=False):
+        """講義カタログを取得（ダッシュボードは1回だけ解析する）"""
+        self._check_login_status()
+        if self.catalog is None or refresh:
+            req_url = f"{self.url}/webclass/?acs_={self.acs['acs_']}"
+            html, charset = await self._get_markup("GET", req_url, data=self.acs)
+            self.catalog = await self._run_blocking(
+                parse_course_catalog, self.url, html, self.acs, self.logger, self.parser, charset
+            )
+        return self.catalog
+
+    async def get_lecture_id_list(self):
+        """講義IDリストを取得"""
+        catalog = await self.get_course_catalog()
+        return catalog.ids() if catalog is not None else []
+
+    async def get_lecture_name(self, lecture_id):
+        """講義名を取得"""
+        catalog = await self.get_course_catalog()
+        return catalog.name(lecture_id) if catalog is not None else None
+
+    async def get_lecture_info(self, lecture_id, item_filter=None):
+        """講義情報を取得（item_filter を指定した場合は条件に合う項目だけを解析する）"""
+        self._check_login_status()
+        course_acs = await self._course_login(lecture_id)
+        return await self._fetch_lecture_info(lecture_id, course_acs, item_filter)
+
+    async def _fetch_lecture_info(self, lecture_id, course_acs, item_filter=None):
+        """講義ログイン済みのacsで講義ページを取得して解析"""
+        course_url = f"{self.url}/webclass/course.php/{lecture_id}/?acs_={course_acs['acs_']}"
+        html, charset = await self._get_markup("GET", course_url, data=course_acs)
+        return await self._run_blocking(
+            parse_lecture_info, html, self.logger, self.parser, charset, course_url, item_filter
+        )
+
+    async def get_lecture_message(self, lecture_id, date="2000-01-01"):
+        """講義メッセージを取得"""
+        self._check_login_status()
+        await self._course_login(lecture_id)
+        return await self._fetch_lecture_message(lecture_id, date)
+
+    async def _fetch_lecture_message(self, lecture_id, date):
+        """講義ログイン済みのセッションでタイムラインのメッセージを取得"""
+        async with self._get_session().get(
+            messages_url(self.url, lecture_id, date), cookies=self.cookie
+        ) as response:
+            body = await response.read()
+        lecture_message = await self._run_blocking(_parse_timeline, body)
+        self.logger.info(f"found {len(lecture_message)} messages")
+        return lecture_message
+
+    @staticmethod
+    async def _run_blocking(func, *args):
+        """HTML・JSONの解析をスレッドプールで実行し、その間イベントループを止めない"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+
+    async def _gather_courses(self, fetch):
+        """全講義に対して fetch を同時に実行し、(講義ID, 結果) のリストを返す"""
+        lecture_ids = await self.get_lecture_id_list()
+        results = await asyncio.gather(
+            *(fetch(lecture_id) for lecture_id in lecture_ids),
+            return_exceptions=True
+        )
+        crawled = []
+        for lecture_id, result in zip(lecture_ids, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"講義ID {lecture_id} の取得に失敗: {result}")
+                continue
+            crawled.append((lecture_id, result))
+        return crawled
+
+    async def _iter_courses(self, fetch):
+        """全講義に対して fetch を同時に実行し、完了した講義から順に (講義ID, 結果) を返す"""
+        lecture_ids = await self.get_lecture_id_list()
+
+        async def run(lecture_id):
+            try:
+                return lecture_id, await fetch(lecture_id), None
+            except Exception as e:
+                return lecture_id, None, e
+
+        for next_done in asyncio.as_completed([run(lecture_id) for lecture_id in lecture_ids]):
+            lecture_id, result, error = await next_done
+            if error is not None:
+                self.logger.warning(f"講義ID {lecture_id} の取得に失敗: {error}")
+                continue
+            yield lecture_id, result
+
+    async def iter_assignments(self, date=None):
+        """取得が終わった講義から順に課題を返す非同期イテレーター"""
+        self._check_login_status()
+        catalog = await self.get_course_catalog()
+        date = (date or datetime.now()).replace(second=0, microsecond=0)
+
+        async def fetch(lecture_id):
+            lecture_info = await self.get_lecture_info(lecture_id, assignment_filter(date))
+            return extract_assignments(lecture_info, catalog.name(lecture_id), date, self.logger)
+
+        async for _, assignments in self._iter_courses(fetch):
+            for assignment in assignments:
+                yield assignment
+
+    async def iter_messages(self, date="2000-01-01"):
+        """取得が終わった講義から順に Message を返す非同期イテレーター"""
+        self._check_login_status()
+        catalog = await self.get_course_catalog()
+
+        async def fetch(lecture_id):
+            return await self.get_lecture_message(lecture_id, date)
+
+        async for lecture_id, messages in self._iter_courses(fetch):
+            subject = catalog.name(lecture_id)
+            for text in messages:
+                yield Message(subject, text, lecture_id)
+
+    async def get_assignment_info(self, date):
+        """課題情報を取得"""
+        self._check_login_status()
+        date_obj = date.replace(second=0, microsecond=0)
+        catalog = await self.get_course_catalog()
+
+        async def fetch(lecture_id):
+            lecture_info = await self.get_lecture_info(lecture_id, assignment_filter(date_obj))
+            return extract_assignments(
+                lecture_info, catalog.name(lecture_id), date_obj, self.logger
+            )
+
+        assignment_info = []
+        for _, assignments in await self._gather_courses(fetch):
+            assignment_info.extend(assignments)
+        self.logger.info(f"found {len(assignment_info)} assignments")
+        return assignment_info
+
+    async def get_all_messages(self, date="2000-01-01"):
+        """全講義のメッセージを Message のリストで取得"""
+        self._check_login_status()
+        catalog = await self.get_course_catalog()
+
+        async def fetch(lecture_id):
+            return await self.get_lecture_message(lecture_id, date)
+
+        all_messages = []
+        for lecture_id, messages in await self._gather_courses(fetch):
+            subject = catalog.name(lecture_id)
+            all_messages.extend(Message(subject, text, lecture_id) for text in messages)
+        return all_messages
+
+    async def crawl(self, date=None, message_date="2000-01-01"):
+        """各講義に1回だけログインし、課題とメッセージをまとめて取得"""
+        self._check_login_status()
+        catalog = await self.get_course_catalog()
+        date = (date or datetime.now()).replace(second=0, microsecond=0)
+
+        async def fetch(lecture_id):
+            subject = catalog.name(lecture_id)
+            course_acs = await self._course_login(lecture_id)
+            lecture_info = await self._fetch_lecture_info(
+                lecture_id, course_acs, assignment_filter(date)
+            )
+            messages = [
+                Message(subject, text, lecture_id)
+                for text in await self._fetch_lecture_message(lecture_id, message_date)
+            ]
+            return {
+                "lecture_id": lecture_id,
+                "subject": subject,
+                "lecture_info": lecture_info,
+                "assignments": extract_assignments(lecture_info, subject, date, self.logger),
+                "messages": messages,
+                "new_messages": messages,
+            }
+
+        snapshots = [snapshot for _, snapshot in await self._gather_courses(fetch)]
+        self.logger.info(f"{len(snapshots)}件の講義を取得しました")
+        return snapshots
+
+    async def __aenter__(self):
+        """非同期コンテキストマネージャーのエントリー"""
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """非同期コンテキストマネージャーの終了処理"""
+        try:
+            if self._is_logged_in:
+                await self.logout()
+        finally:
+            await self.close()
+
+
+def _parse_timeline(body):
+    """タイムラインAPIの本文（JSON）からメッセージを取り出す"""
+    return parse_lecture_messages(json.loads(body))
@@ -0,0 +1,118 @@
+"""
+1日あたりのリクエスト数の上限（リクエスト予算）
+"""
+import json
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+
+
+class RequestBudget:
+    """
+    セッションが送ったリクエストを数え、1日あたりの上限を管理する
+
+    attach() したrequestsのセッションが送ったリクエストごとに1件消費する
+    （ResilientAdapter による再試行も1件ずつ数える）。
+    日付が変わると使用数は0に戻る。
+    """
+
+    def __init__(self, limit, path=None):
+        """
+        初期化
+
+        Args:
+            limit: 1日あたりのリクエスト数の上限（Noneの場合は無制限）
+            path: 使用数を保存するJSONファイル（Noneの場合はメモリ上のみ）
+        """
+        self.limit = limit
+        self.path = path
+        self._day = date.today().isoformat()
+        self._used = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path is not None:
+            self._load()
+
+    def attach(self, session):
+        """requestsのセッションのリクエストを数える（同じセッションに重複して登録しない）"""
+        counted = False
+        for adapter in set(session.adapters.values()):
+            attempt_hooks = getattr(adapter, "attempt_hooks", None)
+            if attempt_hooks is None:
+                continue
+            if self._on_attempt not in attempt_hooks:
+                attempt_hooks.append(self._on_attempt)
+            counted = True
+        if counted:
+            return
+        # 再試行を数えられないアダプターの場合はレスポンスごとに数える
+        hooks = session.hooks.setdefault("response", [])
+        if self._on_response not in hooks:
+            hooks.append(self._on_response)
+
+    def _on_attempt(self, request):
+        self.consume()
+
+    def _on_response(self, response, *args, **kwargs):
+        self.consume()
+
+    def _rollover(self):
+        today = date.today().isoformat()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+            self._dirty = True
+
+    def consume(self, count=1):
+        """リクエストを count 件使用したことを記録"""
+        with self._lock:
+            self._rollover()
+            self._used += count
+            self._dirty = True
+
+    @property
+    def used(self):
+        """本日使用したリクエスト数"""
+        with self._lock:
+            self._rollover()
+            return self._used
+
+    def remaining(self):
+        """本日残っているリクエスト数（無制限の場合はNone）"""
+        if self.limit is None:
+            return None
+        return max(self.limit - self.used, 0)
+
+    def can_afford(self, count):
+        """count 件のリクエストを送る余裕があるか"""
+        remaining = self.remaining()
+        return remaining is None or remaining >= count
+
+    @staticmethod
+    def resets_at():
+        """使用数が0に戻る日時（翌日の0時）"""
+        return datetime.combine(date.today() + timedelta(days=1), time.min)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("day") == self._day:
+            self._used = int(data.get("used", 0))
+
+    def save(self):
+        """変更があればファイルに保存"""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            self._rollover()
+            data = {"day": self._day, "used": self._used}
+            self._dirty = False
+        path = os.fspath(self.path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
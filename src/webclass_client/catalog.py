@@ -0,0 +1,47 @@
+"""
+講義カタログ（ダッシュボードの講義一覧）
+"""
+from .models import Course
+
+
+class CourseCatalog:
+    """ダッシュボード1回分の解析結果を保持する講義一覧"""
+
+    def __init__(self):
+        self._courses = {}
+
+    def add(self, lecture_id, name, course_url, acs):
+        """講義を追加"""
+        self._courses[lecture_id] = Course(lecture_id, name, course_url, acs)
+
+    def ids(self):
+        """講義IDリストを取得"""
+        return list(self._courses)
+
+    def get(self, lecture_id):
+        """講義（Course）を取得"""
+        return self._courses.get(lecture_id)
+
+    def name(self, lecture_id):
+        """講義名を取得"""
+        course = self._courses.get(lecture_id)
+        return course.name if course else None
+
+    def url(self, lecture_id):
+        """講義URLを取得"""
+        course = self._courses.get(lecture_id)
+        return course.url if course else None
+
+    def acs(self, lecture_id):
+        """講義リンクのacsトークンを取得"""
+        course = self._courses.get(lecture_id)
+        return course.acs if course else None
+
+    def __contains__(self, lecture_id):
+        return lecture_id in self._courses
+
+    def __len__(self):
+        return len(self._courses)
+
+    def __iter__(self):
+        return iter(self._courses)
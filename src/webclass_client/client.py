@@ -1,32 +1,93 @@
 """
 WebClassクライアントのメインクラス
 """
+from datetime import datetime
+
 from .logger_setup import setup_logger
 from .session_manager import SessionManager
-from .lectures import get_lecture_id_list, get_lecture_info, get_lecture_name
-from .assignments import get_assignment_info
+from .lectures import (
+    DEFAULT_PARSER, get_course_catalog, get_lecture_id_list, get_lecture_info,
+    get_lecture_name, resolve_parser
+)
+from .assignments import assignment_filter, extract_assignments, get_assignment_info
 from .messages import get_lecture_message
+from .crawler import crawl_courses, iter_courses
+from .snapshot import crawl_course
+from .response_cache import ResponseCache
+from .message_store import MessageStore
+from .models import Message
+from .store import WebClassStore
+from .transport import DEFAULT_TIMEOUT, ExchangeRecorder, ExchangeReplayer
 
 
 class WebClassClient:
     """WebClassとの通信を行うクライアントクラス"""
     
-    def __init__(self, url, debug_mode=False):
+    def __init__(self, url, debug_mode=False, max_workers=1, session_cache_file=None,
+                 response_cache_file=None, response_cache_size=128,
+                 message_store_file=None, store_file=None, parser=DEFAULT_PARSER,
+                 request_budget=None, pool_size=None, timeout=DEFAULT_TIMEOUT, max_retries=3,
+                 retry_backoff=0.5, rate_limiter=None, record_dir=None, replay_dir=None):
         """
         初期化
         
         Args:
             url: WebClassのURL
             debug_mode: デバッグモード
+            max_workers: 講義を並列に取得するスレッド数（1の場合は逐次取得）
+            session_cache_file: セッションを次回の実行に引き継ぐキャッシュファイル
+                （指定した場合、終了時にログアウトせずセッションを保持する）
+            response_cache_file: 講義ページの解析結果キャッシュを保存するファイル
+            response_cache_size: 解析結果キャッシュのエントリ数の上限
+            message_store_file: 取得済みメッセージを保存するファイル
+                （指定した場合、crawl()は前回以降の新着メッセージだけを取得する）
+            store_file: 講義・課題・お知らせを保存するSQLiteファイル
+                （指定した場合、crawl()の結果を保存し self.store から検索できる）
+            parser: HTML解析に使うBeautifulSoupのパーサー（"html.parser" / "lxml" など）
+            request_budget: RequestBudget。指定した場合は送ったリクエストを数える
+            pool_size: 接続プールの接続数（Noneの場合は max_workers に合わせる。最小10）
+            timeout: リクエストごとのタイムアウト（秒、または (接続, 読み込み) のタプル）
+            max_retries: 接続エラーや5xx・429応答を再試行する回数
+            retry_backoff: 再試行の待ち時間の基準（秒）。試行ごとに倍になり、ジッターを加える
+            rate_limiter: TokenBucket。指定した場合は全リクエストの流量を制限する
+                （複数のクライアントで共有できる）
+            record_dir: 指定した場合は全リクエストとレスポンスをこのディレクトリに記録する
+            replay_dir: 指定した場合はネットワークに接続せず、record_dir で記録した
+                レスポンスを返す（記録にないリクエストは接続エラーになる）
         """
         self.url = url
         self.login_info = {"username": "", "val": ""}
-        self.session_manager = SessionManager()
+        self.session_manager = SessionManager(
+            pool_size=pool_size or max(10, max_workers or 1),
+            timeout=timeout,
+            max_retries=max_retries,
+            backoff=retry_backoff,
+            rate_limiter=rate_limiter,
+            recorder=ExchangeRecorder(record_dir) if record_dir else None,
+            replayer=ExchangeReplayer(replay_dir) if replay_dir else None
+        )
         self.acs = {"acs_": "12345678"}
         self.cookie = None
+        self.catalog = None
         self.debug_mode = debug_mode
+        self.max_workers = max_workers
+        self.session_cache_file = session_cache_file
+        self.response_cache = (
+            ResponseCache(response_cache_file, response_cache_size)
+            if response_cache_file else None
+        )
+        self.message_store = MessageStore(message_store_file) if message_store_file else None
+        self.store = WebClassStore(store_file) if store_file else None
         self.logger = setup_logger(__name__, debug_mode=debug_mode)
+        self.parser = resolve_parser(parser, self.logger)
+        self.request_budget = request_budget
         self._is_logged_in = False
+        self._attach_budget()
+
+    def _attach_budget(self):
+        """リクエスト予算をセッションに登録（ログアウトでセッションが作り直されるたびに呼ぶ）"""
+        if self.request_budget is not None:
+            self.request_budget.attach(self.session_manager.session)
 
     def set_login_info(self, username, password):
         """ログイン情報を設定"""
@@ -41,7 +102,9 @@ class WebClassClient:
         self.cookie = self.session_manager.set_wbt_session(wbt_session, self.logger)
 
     def login(self):
-        """ログイン処理"""
+        """ログイン処理（キャッシュされたセッションが有効ならそれを再利用）"""
+        if self.session_cache_file and self._restore_session():
+            return True
         try:
             session, acs, cookie = self.session_manager.login(
                 self.url, self.login_info, self.logger
@@ -49,8 +112,14 @@ class WebClassClient:
             if session is not None:
                 self.acs = acs
                 self.cookie = cookie
+                self.catalog = None
                 self._is_logged_in = True
                 self.logger.info("ログインに成功しました")
+                if self.session_cache_file:
+                    self.session_manager.save_session(
+                        self.session_cache_file, self.url,
+                        self.login_info["username"], self.logger
+                    )
                 return True
             else:
                 self.logger.error("ログインに失敗しました")
@@ -59,12 +128,43 @@ class WebClassClient:
             self.logger.error(f"ログイン処理中にエラーが発生しました: {e}")
             return False
 
+    def _restore_session(self):
+        """キャッシュされたセッションを読み込み、ダッシュボード取得で有効性を確認"""
+        acs, cookie = self.session_manager.load_session(
+            self.session_cache_file, self.url,
+            self.login_info["username"], self.logger
+        )
+        if cookie is None:
+            return False
+        self.acs = dict(acs)
+        self.cookie = cookie
+        self._is_logged_in = True
+        try:
+            # 有効性の確認に使ったダッシュボードはそのまま講義カタログとして使う
+            catalog = self.get_course_catalog(refresh=True)
+        except Exception as e:
+            self.logger.warning(f"セッションの確認中にエラーが発生しました: {e}")
+            catalog = None
+        # 期限切れのセッションではログインページが返り、講義が1件もない空のカタログになる
+        if not catalog:
+            self.logger.info("キャッシュされたセッションは無効です。再ログインします")
+            self.session_manager.clear_session(self.session_cache_file)
+            self.acs = {"acs_": "12345678"}
+            self.cookie = None
+            self.catalog = None
+            self._is_logged_in = False
+            return False
+        self.logger.info("キャッシュされたセッションを再利用します")
+        return True
+
     def logout(self):
         """ログアウト処理"""
         try:
             result = self.session_manager.logout(self.url, self.logger)
             if result:
                 self._is_logged_in = False
+                self.catalog = None
+                self._attach_budget()
                 self.logger.info("ログアウトしました")
             return result
         except Exception as e:
@@ -76,20 +176,43 @@ class WebClassClient:
         if not self._is_logged_in:
             raise RuntimeError("ログインしていません。先にlogin()を呼び出してください。")
 
+    def get_course_catalog(self, refresh=False):
+        """
+        講義カタログを取得（ダッシュボードは1回だけ解析し、結果をキャッシュする）
+
+        Args:
+            refresh: Trueの場合はダッシュボードを再取得する
+        """
+        self._check_login_status()
+        if self.catalog is None or refresh:
+            self.catalog = get_course_catalog(
+                self.url, self.acs, self.cookie,
+                self.session_manager.session, self.logger, self.parser
+            )
+        return self.catalog
+
     def get_lecture_id_list(self):
         """講義IDリストを取得"""
         self._check_login_status()
         return get_lecture_id_list(
             self.url, self.acs, self.cookie, 
-            self.session_manager.session, self.logger
+            self.session_manager.session, self.logger,
+            catalog=self.get_course_catalog()
         )
 
-    def get_lecture_info(self, lecture_id):
-        """講義情報を取得"""
+    def _course_acs(self, lecture_id):
+        """講義ごとに独立したacsを作成（共有のself.acsは変更しない）"""
+        catalog = self.get_course_catalog()
+        token = catalog.acs(lecture_id) if catalog is not None else None
+        return {"acs_": token or self.acs["acs_"]}
+
+    def get_lecture_info(self, lecture_id, item_filter=None):
+        """講義情報を取得（item_filter を指定した場合は条件に合う項目だけを解析する）"""
         self._check_login_status()
         return get_lecture_info(
-            self.url, lecture_id, self.acs, self.cookie, 
-            self.session_manager.session, self.logger
+            self.url, lecture_id, self._course_acs(lecture_id), self.cookie, 
+            self.session_manager.session, self.logger, self.response_cache,
+            self.parser, item_filter
         )
 
     def get_lecture_name(self, lecture_id):
@@ -97,7 +220,8 @@ class WebClassClient:
         self._check_login_status()
         return get_lecture_name(
             self.url, lecture_id, self.acs, self.cookie, 
-            self.session_manager.session, self.logger
+            self.session_manager.session, self.logger,
+            catalog=self.get_course_catalog()
         )
 
     def get_assignment_info(self, date="2000-01-01"):
@@ -105,22 +229,155 @@ class WebClassClient:
         self._check_login_status()
         return get_assignment_info(
             self.url, self.acs, self.cookie, 
-            self.session_manager.session, date, self.logger
+            self.session_manager.session, date, self.logger,
+            catalog=self.get_course_catalog(),
+            max_workers=self.max_workers,
+            cache=self.response_cache,
+            parser=self.parser
         )
 
     def get_lecture_message(self, lecture_id, date="2000-01-01"):
         """講義メッセージを取得"""
         self._check_login_status()
         return get_lecture_message(
-            self.url, lecture_id, self.acs, self.cookie, 
+            self.url, lecture_id, self._course_acs(lecture_id), self.cookie, 
             self.session_manager.session, date, self.logger
         )
 
+    def get_all_messages(self, date="2000-01-01"):
+        """全講義のメッセージを Message のリストで取得"""
+        self._check_login_status()
+        catalog = self.get_course_catalog()
+        if catalog is None:
+            return []
+
+        def fetch(lecture_id):
+            return self.get_lecture_message(lecture_id, date)
+
+        all_messages = []
+        for lecture_id, messages in crawl_courses(
+            catalog.ids(), fetch, self.max_workers, self.logger
+        ):
+            subject = catalog.name(lecture_id)
+            all_messages.extend(Message(subject, text, lecture_id) for text in messages)
+        return all_messages
+
+    def iter_snapshots(self, date=None, message_date="2000-01-01", lecture_ids=None,
+                       item_filter=None):
+        """
+        各講義に1回だけログインし、取得が終わった講義から順にスナップショットを返すジェネレーター
+
+        Args:
+            date: 課題の受付期間判定に使う日時（Noneの場合は現在時刻）
+            message_date: この日付より新しいメッセージを取得する
+            lecture_ids: 取得する講義IDのリスト（Noneの場合は全講義）
+            item_filter: 講義ページの解析時に項目を絞り込む ItemFilter（Noneの場合は
+                資料と期限切れの項目を読み飛ばす）
+        """
+        self._check_login_status()
+        catalog = self.get_course_catalog()
+        if catalog is None:
+            return
+        date = (date or datetime.now()).replace(second=0, microsecond=0)
+
+        def fetch(lecture_id):
+            return crawl_course(
+                self.url, lecture_id, catalog.name(lecture_id),
+                self._course_acs(lecture_id), self.cookie,
+                self.session_manager.session, date, message_date, self.logger,
+                self.response_cache, self.message_store, self.parser, item_filter
+            )
+
+        if lecture_ids is None:
+            lecture_ids = catalog.ids()
+        else:
+            lecture_ids = [lecture_id for lecture_id in lecture_ids if lecture_id in catalog]
+
+        if self.store is not None:
+            self.store.upsert_courses(catalog)
+        try:
+            for _, snapshot in iter_courses(lecture_ids, fetch, self.max_workers, self.logger):
+                if self.store is not None:
+                    self.store.upsert_snapshots([snapshot])
+                yield snapshot
+        finally:
+            self._save_caches()
+
+    def crawl(self, date=None, message_date="2000-01-01", lecture_ids=None, item_filter=None):
+        """
+        各講義に1回だけログインし、課題とメッセージをまとめて取得
+
+        Args:
+            date: 課題の受付期間判定に使う日時（Noneの場合は現在時刻）
+            message_date: この日付より新しいメッセージを取得する
+            lecture_ids: 取得する講義IDのリスト（Noneの場合は全講義）
+            item_filter: 講義ページの解析時に項目を絞り込む ItemFilter（Noneの場合は
+                資料と期限切れの項目を読み飛ばす）
+
+        Returns:
+            講義ごとのスナップショット（辞書）のリスト（講義一覧の順）
+        """
+        snapshots = list(self.iter_snapshots(date, message_date, lecture_ids, item_filter))
+        if snapshots:
+            order = {lecture_id: i for i, lecture_id in enumerate(self.catalog.ids())}
+            snapshots.sort(key=lambda snapshot: order[snapshot["lecture_id"]])
+        self.logger.info(f"{len(snapshots)}件の講義を取得しました")
+        return snapshots
+
+    def iter_assignments(self, date=None):
+        """
+        取得が終わった講義から順に課題を返すジェネレーター
+
+        Args:
+            date: 課題の受付期間判定に使う日時（Noneの場合は現在時刻）
+        """
+        self._check_login_status()
+        catalog = self.get_course_catalog()
+        if catalog is None:
+            return
+        date = (date or datetime.now()).replace(second=0, microsecond=0)
+
+        def fetch(lecture_id):
+            lecture_info = self.get_lecture_info(lecture_id, assignment_filter(date))
+            return extract_assignments(lecture_info, catalog.name(lecture_id), date, self.logger)
+
+        try:
+            for _, assignments in iter_courses(catalog.ids(), fetch, self.max_workers, self.logger):
+                yield from assignments
+        finally:
+            self._save_caches()
+
+    def iter_messages(self, date="2000-01-01"):
+        """取得が終わった講義から順に Message を返すジェネレーター"""
+        self._check_login_status()
+        catalog = self.get_course_catalog()
+        if catalog is None:
+            return
+
+        def fetch(lecture_id):
+            return self.get_lecture_message(lecture_id, date)
+
+        for lecture_id, messages in iter_courses(catalog.ids(), fetch, self.max_workers, self.logger):
+            subject = catalog.name(lecture_id)
+            for text in messages:
+                yield Message(subject, text, lecture_id)
+
+    def _save_caches(self):
+        """解析結果キャッシュとメッセージストアを保存"""
+        if self.response_cache is not None:
+            self.response_cache.save()
+        if self.message_store is not None:
+            self.message_store.save()
+
     def __enter__(self):
         """コンテキストマネージャーのエントリー"""
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """コンテキストマネージャーの終了処理"""
-        if self._is_logged_in:
+        self._save_caches()
+        if self.store is not None:
+            self.store.close()
+        # セッションをキャッシュしている場合は次回に再利用するためログアウトしない
+        if self._is_logged_in and not self.session_cache_file:
             self.logout()
@@ -0,0 +1,83 @@
+"""
+講義単位の並列クロールエンジン
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+
+def crawl_courses(lecture_ids, fetch, max_workers, logger):
+    """
+    講義ごとに fetch(lecture_id) を実行し、(講義ID, 結果) のリストを講義ID順で返す
+
+    max_workers が1以下の場合は逐次実行する。個別の講義で失敗した場合は
+    警告を記録してその講義を結果から除外する。
+
+    Args:
+        lecture_ids: 講義IDのリスト
+        fetch: 講義IDを受け取り結果を返す関数
+        max_workers: 同時に処理する講義数
+        logger: ロガー
+    """
+    lecture_ids = list(lecture_ids)
+
+    def run(lecture_id):
+        try:
+            return fetch(lecture_id)
+        except Exception as e:
+            logger.warning(f"講義ID {lecture_id} の取得に失敗: {e}")
+            return _FAILED
+
+    if max_workers is None or max_workers <= 1 or len(lecture_ids) <= 1:
+        results = [run(lecture_id) for lecture_id in lecture_ids]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(lecture_ids))) as executor:
+            results = list(executor.map(run, lecture_ids))
+
+    return [
+        (lecture_id, result)
+        for lecture_id, result in zip(lecture_ids, results)
+        if result is not _FAILED
+    ]
+
+
+def iter_courses(lecture_ids, fetch, max_workers, logger):
+    """
+    講義ごとに fetch(lecture_id) を実行し、完了した講義から順に (講義ID, 結果) を返すジェネレーター
+
+    同時に処理中の講義は max_workers 件までに抑えるため、未消費の結果が
+    溜まり続けることはない。失敗した講義は警告を記録して飛ばす。
+
+    Args:
+        lecture_ids: 講義IDのリスト
+        fetch: 講義IDを受け取り結果を返す関数
+        max_workers: 同時に処理する講義数
+        logger: ロガー
+    """
+    def run(lecture_id):
+        try:
+            return lecture_id, fetch(lecture_id)
+        except Exception as e:
+            logger.warning(f"講義ID {lecture_id} の取得に失敗: {e}")
+            return lecture_id, _FAILED
+
+    if max_workers is None or max_workers <= 1:
+        for lecture_id in lecture_ids:
+            lecture_id, result = run(lecture_id)
+            if result is not _FAILED:
+                yield lecture_id, result
+        return
+
+    remaining = iter(lecture_ids)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(run, lecture_id) for lecture_id in islice(remaining, max_workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for lecture_id in islice(remaining, 1):
+                    pending.add(executor.submit(run, lecture_id))
+                lecture_id, result = future.result()
+                if result is not _FAILED:
+                    yield lecture_id, result
+
+
+_FAILED = object()
@@ -0,0 +1,112 @@
+"""
+ログインしたまま講義を定期的に取得し直す常駐モード
+"""
+import threading
+from datetime import datetime, timedelta
+
+# 講義1件の取得に使うリクエスト数（講義ログイン・講義ページ・タイムライン）
+COURSE_POLL_COST = 3
+# 講義一覧（ダッシュボード）の取得に使うリクエスト数
+CATALOG_POLL_COST = 1
+
+
+def watch(client, scheduler, on_update, logger, stop_event=None, message_date="2000-01-01",
+          catalog_interval=60 * 60, budget=None):
+    """
+    講義ごとの取得時刻になった講義だけを取得し直し、変更があれば on_update を呼ぶ
+
+    講義一覧は catalog_interval 秒ごとに取得し直し、セッションの維持と
+    有効性の確認を兼ねる。セッションが無効になっていれば再ログインする。
+    stop_event がセットされるまで繰り返す。
+
+    Args:
+        client: ログイン済みのWebClassClient
+        scheduler: PollScheduler
+        on_update: 講義一覧の順に並べた最新のスナップショットのリストを受け取る関数
+        logger: ロガー
+        stop_event: 終了を指示するthreading.Event
+        message_date: この日付より新しいメッセージを取得する
+        catalog_interval: 講義一覧を取得し直す間隔（秒）
+        budget: RequestBudget。指定した場合は残りのリクエスト数の範囲で取得する
+    """
+    stop_event = stop_event or threading.Event()
+    latest = {}
+    catalog = None
+    next_catalog_at = datetime.now()
+
+    while not stop_event.is_set():
+        now = datetime.now()
+        if now >= next_catalog_at:
+            if budget is not None and not budget.can_afford(CATALOG_POLL_COST):
+                _wait_for_budget(budget, stop_event, logger)
+                continue
+            catalog = _refresh_catalog(client, logger)
+            if catalog is None:
+                next_catalog_at = now + timedelta(seconds=scheduler.min_interval)
+                stop_event.wait(scheduler.min_interval)
+                continue
+            scheduler.sync(catalog.ids(), now)
+            for lecture_id in set(latest) - set(catalog.ids()):
+                del latest[lecture_id]
+            next_catalog_at = now + timedelta(seconds=catalog_interval)
+
+        due = scheduler.due(now)
+        # 上限のない予算（remaining() が None）の場合は期限の来た講義をすべて取得する
+        if budget is not None and budget.remaining() is not None:
+            affordable = budget.remaining() // COURSE_POLL_COST
+            if due and affordable == 0:
+                _wait_for_budget(budget, stop_event, logger)
+                continue
+            due = due[:affordable]
+
+        if due:
+            logger.info(f"{len(due)}件の講義を取得します")
+            changed = False
+            polled = set()
+            for snapshot in client.iter_snapshots(now, message_date, lecture_ids=due):
+                lecture_id = snapshot["lecture_id"]
+                polled.add(lecture_id)
+                if scheduler.record(lecture_id, snapshot, now):
+                    changed = True
+                latest[lecture_id] = snapshot
+                logger.debug(
+                    f"講義ID {lecture_id} の次回取得まで {scheduler.interval(lecture_id):.0f}秒"
+                )
+            failed = [lecture_id for lecture_id in due if lecture_id not in polled]
+            for lecture_id in failed:
+                scheduler.record_failure(lecture_id, now)
+            if failed and not polled:
+                # すべて失敗した場合はセッション切れの可能性があるため講義一覧から確認し直す
+                next_catalog_at = datetime.now()
+            if changed:
+                on_update([latest[lecture_id] for lecture_id in catalog.ids() if lecture_id in latest])
+            if budget is not None:
+                budget.save()
+
+        next_at = min(filter(None, [scheduler.next_at(), next_catalog_at]))
+        stop_event.wait(max((next_at - datetime.now()).total_seconds(), 1))
+
+
+def _refresh_catalog(client, logger):
+    """講義一覧を取得し直す（セッションが無効なら再ログインする）"""
+    try:
+        catalog = client.get_course_catalog(refresh=True)
+    except Exception as e:
+        logger.warning(f"講義一覧の取得に失敗しました: {e}")
+        catalog = None
+    # セッションが切れるとログインページが返り、講義が1件もない空のカタログになる
+    if catalog:
+        return catalog
+    logger.info("セッションが無効になったため再ログインします")
+    if not client.login():
+        logger.error("再ログインに失敗しました")
+        return None
+    return client.get_course_catalog()
+
+
+def _wait_for_budget(budget, stop_event, logger):
+    """リクエスト予算が翌日に戻るまで待つ"""
+    resets_at = budget.resets_at()
+    logger.warning(f"リクエスト数が上限に達したため {resets_at:%Y-%m-%d %H:%M} まで待機します")
+    budget.save()
+    stop_event.wait(max((resets_at - datetime.now()).total_seconds(), 1))
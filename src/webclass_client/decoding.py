@@ -0,0 +1,59 @@
+"""
+レスポンスの文字コード判定
+"""
+import threading
+from urllib.parse import urlsplit
+
+
+class CharsetRegistry:
+    """ホストごとに実際に使われていた文字コードを記録する"""
+
+    def __init__(self):
+        self._charsets = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """URLのホストで前回使われた文字コード（未記録ならNone）"""
+        with self._lock:
+            return self._charsets.get(urlsplit(url).netloc)
+
+    def learn(self, url, charset):
+        """URLのホストで使われた文字コードを記録"""
+        if not charset:
+            return
+        with self._lock:
+            self._charsets[urlsplit(url).netloc] = charset
+
+
+LEARNED_CHARSETS = CharsetRegistry()
+
+
+def declared_charset(content_type):
+    """Content-Typeヘッダーで宣言された文字コード（宣言がなければNone）"""
+    if not content_type:
+        return None
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            return value.strip().strip("\"'") or None
+    return None
+
+
+def response_charset(url, content_type):
+    """
+    解析に使う文字コードを決める
+
+    宣言された文字コード、なければホストで学習済みの文字コードを返す。
+    どちらもない場合はNoneを返し、BeautifulSoup側の判定に任せる。
+    """
+    return declared_charset(content_type) or LEARNED_CHARSETS.get(url)
+
+
+def response_markup(response):
+    """requestsのレスポンスから (本文のバイト列, 文字コード) を取得（本文はデコードしない）"""
+    return response.content, response_charset(response.url, response.headers.get("Content-Type"))
+
+
+def learn_charset(url, soup):
+    """解析に成功した文字コードをホストごとに記録"""
+    LEARNED_CHARSETS.learn(url, getattr(soup, "original_encoding", None))
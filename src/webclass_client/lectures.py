@@ -1,104 +1,296 @@
-from bs4 import BeautifulSoup as bs4
+from bs4 import BeautifulSoup as bs4, FeatureNotFound, SoupStrainer
 import re
+from datetime import datetime
 
-def get_lecture_id_list(url, acs, cookie, session, logger):
+from .catalog import CourseCatalog
+from .decoding import learn_charset, response_markup
+from .metrics import METRICS
+from .models import Assignment, parse_datetime
+
+DEFAULT_PARSER = "html.parser"
+COURSE_CONTAINER_CLASS = "col-xs-12 col-sm-8 col-md-9 col-lg-10"
+
+# 使うのはダッシュボードの講義表と講義ページのコンテンツ領域だけなので、その部分木だけを構築する
+DASHBOARD_STRAINER = SoupStrainer("table")
+COURSE_STRAINER = SoupStrainer("div", class_=COURSE_CONTAINER_CLASS)
+
+def resolve_parser(parser, logger):
+    """パーサー名を検証し、利用できない場合は標準のhtml.parserを返す"""
+    if not parser or parser == DEFAULT_PARSER:
+        return DEFAULT_PARSER
+    try:
+        bs4("", parser)
+    except FeatureNotFound:
+        logger.warning(f"parser {parser} is not available, fall back to {DEFAULT_PARSER}")
+        return DEFAULT_PARSER
+    return parser
+
+class ItemFilter:
+    """
+    講義ページの項目を解析の途中で絞り込む条件
+
+    カテゴリの条件に合わない項目は名前や受付期間を取り出す前に、受付期間が
+    [not_before, not_after] と重ならない項目は名前を取り出す前に読み飛ばす。
+    受付期間の条件を指定した場合、期間の表示がない項目は含めない。
+    """
+
+    def __init__(self, include_categories=None, exclude_categories=None, not_before=None,
+                 not_after=None):
+        """
+        初期化
+
+        Args:
+            include_categories: 含めるカテゴリ（Noneの場合はすべて）
+            exclude_categories: 除くカテゴリ
+            not_before: この日時より前に期限を迎えた項目を除く
+            not_after: この日時より後に受付が始まる項目を除く
+        """
+        self.include_categories = (
+            frozenset(include_categories) if include_categories is not None else None
+        )
+        self.exclude_categories = frozenset(exclude_categories or ())
+        self.not_before = not_before
+        self.not_after = not_after
+
+    @property
+    def has_window(self):
+        return self.not_before is not None or self.not_after is not None
+
+    def accepts_category(self, category):
+        """カテゴリが条件に合うか"""
+        if category in self.exclude_categories:
+            return False
+        return self.include_categories is None or category in self.include_categories
+
+    def accepts_period(self, available_from, deadline):
+        """受付期間が [not_before, not_after] と重なるか"""
+        if not self.has_window:
+            return True
+        if available_from is None or deadline is None:
+            return False
+        if self.not_before is not None and deadline <= self.not_before:
+            return False
+        return self.not_after is None or available_from < self.not_after
+
+    def accepts(self, item):
+        """解析済みの項目（Assignment）が条件に合うか"""
+        return (
+            self.accepts_category(item.category)
+            and self.accepts_period(item.available_from, item.deadline)
+        )
+
+    def covers(self, other):
+        """other に合う項目がすべてこの条件にも合うか（キャッシュした解析結果を再利用できるか）"""
+        if other is None:
+            other = ItemFilter()
+        if self.include_categories is not None and (
+            other.include_categories is None
+            or not other.include_categories <= self.include_categories
+        ):
+            return False
+        extra_excluded = self.exclude_categories - other.exclude_categories
+        if extra_excluded and (
+            other.include_categories is None or extra_excluded & other.include_categories
+        ):
+            return False
+        if self.not_before is not None and (
+            other.not_before is None or other.not_before < self.not_before
+        ):
+            return False
+        if self.not_after is not None and (
+            other.not_after is None or other.not_after > self.not_after
+        ):
+            return False
+        return True
+
+    def to_dict(self):
+        """キャッシュに保存するための辞書"""
+        return {
+            "include": sorted(self.include_categories) if self.include_categories is not None else None,
+            "exclude": sorted(self.exclude_categories),
+            "not_before": self.not_before.isoformat() if self.not_before else None,
+            "not_after": self.not_after.isoformat() if self.not_after else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict() の辞書から復元"""
+        return cls(
+            data.get("include"), data.get("exclude"),
+            datetime.fromisoformat(data["not_before"]) if data.get("not_before") else None,
+            datetime.fromisoformat(data["not_after"]) if data.get("not_after") else None,
+        )
+
+def get_course_catalog(url, acs, cookie, session, logger, parser=DEFAULT_PARSER):
     if url is None or cookie is None:
         logger.error("did not login")
-        return []
-    lecture_id_list = []
+        return None
     req_url = f"{url}/webclass/?acs_={acs['acs_']}"
     response = session.get(req_url, data=acs, cookies=cookie)
-    response.encoding = response.apparent_encoding
-    if len(response.text) <= 1000:
+    markup, charset = response_markup(response)
+    return parse_course_catalog(url, markup, acs, logger, parser, charset)
+
+def _make_soup(markup, parser, strainer, charset):
+    """バイト列はそのまま渡し、既知の文字コードを最初に試させる（失敗時のみ自動判定）"""
+    if isinstance(markup, bytes):
+        return bs4(markup, parser, parse_only=strainer, from_encoding=charset)
+    return bs4(markup, parser, parse_only=strainer)
+
+@METRICS.timed("parse_dashboard")
+def parse_course_catalog(url, html, acs, logger, parser=DEFAULT_PARSER, charset=None):
+    if len(html) <= 1000:
         logger.error("login failed")
-        return []
-    soup = bs4(response.text, "html.parser")
+        return None
+    catalog = CourseCatalog()
+    soup = _make_soup(html, parser, DASHBOARD_STRAINER, charset)
+    learn_charset(url, soup)
     table = soup.find("table")
     if table is None:
         logger.error("login data is invalid")
-        return lecture_id_list
+        return catalog
     links = table.find_all(href=re.compile("/webclass/course.php/"))
     if len(links) == 0:
         logger.error("lecture not found")
-        return []
+        return catalog
     acs_found = re.findall(r'acs_=([a-zA-Z0-9]+)', str(links[0]))
     if acs_found:
         acs["acs_"] = acs_found[-1]
     for link in links:
         ids = re.findall(r'([a-zA-Z0-9]+)', link.contents[0])
-        if ids:
-            lecture_id_list.append(ids[-1])
-    return lecture_id_list
+        if not ids:
+            continue
+        link_acs = re.findall(r'acs_=([a-zA-Z0-9]+)', link.get("href", ""))
+        catalog.add(
+            ids[-1],
+            link.contents[0].lstrip('»').strip(),
+            f"{url}{link.get('href', '')}",
+            link_acs[-1] if link_acs else acs["acs_"],
+        )
+    return catalog
 
-def get_lecture_info(url, lecture_id, acs, cookie, session, logger):
-    if url is None or cookie is None:
-        logger.error("did not login")
-        return {}
-    lecture_info = {}
+def get_lecture_id_list(url, acs, cookie, session, logger, catalog=None, parser=DEFAULT_PARSER):
+    if catalog is None:
+        catalog = get_course_catalog(url, acs, cookie, session, logger, parser)
+    if catalog is None:
+        return []
+    return catalog.ids()
+
+def parse_acs(text):
+    """レスポンス本文（文字列またはバイト列）から最後に現れるacsトークンを取得"""
+    if isinstance(text, bytes):
+        return re.findall(rb'acs_=([a-zA-Z0-9]+)', text)[-1].decode("ascii")
+    return re.findall(r'acs_=([a-zA-Z0-9]+)', text)[-1]
+
+def course_login(url, lecture_id, acs, cookie, session):
+    """講義にログインし、その講義専用のacsを返す（引数のacsは変更しない）"""
     login_url = f"{url}/webclass/course.php/{lecture_id}/login?acs_={acs['acs_']}"
     acs_html = session.post(login_url, data=acs, cookies=cookie)
-    acs["acs_"] = re.findall(r'acs_=([a-zA-Z0-9]+)', acs_html.text)[-1]
-    course_url = f"{url}/webclass/course.php/{lecture_id}/?acs_={acs['acs_']}"
-    response = session.get(course_url, data=acs, cookies=cookie)
-    response.encoding = response.apparent_encoding
-    if len(response.text) <= 1000:
+    return {"acs_": parse_acs(acs_html.content)}
+
+def get_lecture_info(url, lecture_id, acs, cookie, session, logger, cache=None, parser=DEFAULT_PARSER,
+                     item_filter=None):
+    if url is None or cookie is None:
+        logger.error("did not login")
+        return []
+    course_acs = course_login(url, lecture_id, acs, cookie, session)
+    return fetch_lecture_info(
+        url, lecture_id, course_acs, cookie, session, logger, cache, parser, item_filter
+    )
+
+def fetch_lecture_info(url, lecture_id, course_acs, cookie, session, logger, cache=None,
+                       parser=DEFAULT_PARSER, item_filter=None):
+    """
+    講義ログイン済みのacsで講義ページを取得して解析する（本文が前回と同じなら解析を省略）
+
+    キャッシュした解析結果は、そのときの item_filter が今回の条件を包含する場合だけ
+    再利用する（今回の条件で絞り直して返す）。
+    """
+    course_url = f"{url}/webclass/course.php/{lecture_id}/?acs_={course_acs['acs_']}"
+    response = session.get(course_url, data=course_acs, cookies=cookie)
+    if cache is not None:
+        key = cache.make_key(lecture_id, course_url)
+        body_hash = cache.body_hash(response.content)
+        cached = cache.lookup(key, body_hash)
+        if cached is not None and ItemFilter.from_dict(cached["filter"]).covers(item_filter):
+            logger.debug(f"lecture {lecture_id} is unchanged, skip parsing")
+            items = [Assignment.from_row(row) for row in cached["items"]]
+            if item_filter is not None:
+                items = [item for item in items if item_filter.accepts(item)]
+            return items
+    markup, charset = response_markup(response)
+    lecture_info = parse_lecture_info(markup, logger, parser, charset, url, item_filter)
+    if cache is not None:
+        cache.store(key, body_hash, {
+            "filter": (item_filter or ItemFilter()).to_dict(),
+            "items": [item.to_row() for item in lecture_info],
+        })
+    return lecture_info
+
+@METRICS.timed("parse_course")
+def parse_lecture_info(html, logger, parser=DEFAULT_PARSER, charset=None, url=None,
+                       item_filter=None):
+    """
+    講義ページの項目を Assignment のリスト（ページ上の順）として返す
+
+    item_filter（ItemFilter）を指定した場合は、条件に合わない項目を
+    名前などを取り出す前に読み飛ばす。
+    """
+    if len(html) <= 1000:
         logger.error("login failed")
-        return {}
-    soup = bs4(response.text, "html.parser")
-    target_container = soup.find("div", class_="col-xs-12 col-sm-8 col-md-9 col-lg-10")
+        return []
+    items = []
+    soup = _make_soup(html, parser, COURSE_STRAINER, charset)
+    if url is not None:
+        learn_charset(url, soup)
+    target_container = soup.find("div", class_=COURSE_CONTAINER_CLASS)
     if not target_container:
         logger.error("lecture info container not found")
-        return {}
+        return []
+    check_period = item_filter is not None and item_filter.has_window
     sections = target_container.find_all("section", class_="panel panel-default cl-contentsList_folder")
     for i, section in enumerate(sections):
         section_title = section.find("h4", class_="panel-title")
         section_name = section_title.text if section_title and section_title.text != '' else f"section{i}"
-        content_dict = {}
-        j = 0
         for content in section.find_all("section", "list-group-item cl-contentsList_listGroupItem"):
             for item in content.find_all("div", class_="cl-contentsList_content"):
-                item_dict = {}
-                item_name = item.find("h4", "cm-contentsList_contentName").text.replace("New", "").replace("\n", "")
                 item_category = item.find("div", "cl-contentsList_categoryLabel").text
+                if item_filter is not None and not item_filter.accepts_category(item_category):
+                    continue
                 period_array = item.find_all("div", "cm-contentsList_contentDetailListItemData")
-                try:
-                    if period_array:
-                        item_availability_period = period_array[-1].text
-                    else:
-                        item_availability_period = None
-                except Exception as e:
-                    logger.error(f"error: {e}")
-                    item_availability_period = None
-                if item_availability_period:
-                    splits = item_availability_period.split(" - ")
-                    period_from = splits[0].lstrip()
-                    period_to = splits[1].lstrip() if len(splits) > 1 else None
-                else:
-                    period_from = None
-                    period_to = None
-                item_dict["name"] = item_name
-                item_dict["category"] = item_category
-                item_dict["availability_period_from"] = period_from
-                item_dict["availability_period_to"] = period_to
-                content_dict[f"item{j}"] = item_dict
-                j += 1
-        lecture_info[section_name] = content_dict
-    return lecture_info
+                period = period_array[-1].text if period_array else None
+                available_from, deadline = _parse_period(period, logger)
+                if check_period and not item_filter.accepts_period(available_from, deadline):
+                    continue
+                item_name = item.find("h4", "cm-contentsList_contentName").text.replace("New", "").replace("\n", "")
+                items.append(Assignment(
+                    item_name, item_category, available_from, deadline, section_name
+                ))
+    return items
 
-def get_lecture_name(url, lecture_id, acs, cookie, session, logger):
-    if url is None or cookie is None:
-        logger.error("did not login")
-        return None
-    req_url = f"{url}/webclass/?acs_={acs['acs_']}"
-    response = session.get(req_url, data=acs, cookies=cookie)
-    response.encoding = response.apparent_encoding
-    if len(response.text) <= 1000:
-        logger.error("login failed")
+def _parse_period(period, logger):
+    """受付期間の表示（"YYYY/MM/DD HH:MM - YYYY/MM/DD HH:MM"）を (開始, 終了) のdatetimeに変換"""
+    if not period:
+        return None, None
+    splits = period.split(" - ")
+    if len(splits) < 2:
+        # 期間でない表示（開始日時だけの項目など）は課題の判定に使わないため、解析できなくてよい
+        try:
+            return parse_datetime(splits[0]), None
+        except ValueError:
+            return None, None
+    try:
+        return parse_datetime(splits[0]), parse_datetime(splits[1])
+    except ValueError as e:
+        logger.error(f"Error parsing dates: {e}")
+        return None, None
+
+def get_lecture_name(url, lecture_id, acs, cookie, session, logger, catalog=None,
+                     parser=DEFAULT_PARSER):
+    if catalog is None:
+        catalog = get_course_catalog(url, acs, cookie, session, logger, parser)
+    if catalog is None:
         return None
-    soup = bs4(response.text, "html.parser")
-    for lecture in soup.find_all("a", href=re.compile("/webclass/course.php/")):
-        name = lecture.contents[0].lstrip('»').strip()
-        if lecture_id in name:
-            return name
-    logger.error("lecture not found")
-    return None
+    name = catalog.name(lecture_id)
+    if name is None:
+        logger.error("lecture not found")
+    return name
@@ -52,4 +52,15 @@ def setup_logger(name, log_file=None, debug_mode=False):
     # 親ロガーへの伝播を無効化
     logger.propagate = False
     
-    return logger
\ No newline at end of file
+    return logger
+
+def close_logger(logger):
+    """
+    setup_logger で設定したハンドラーを閉じて取り外す
+
+    Args:
+        logger: ロガー
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
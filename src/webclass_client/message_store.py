@@ -0,0 +1,119 @@
+"""
+講義ごとのメッセージ保存とハイウォーターマーク管理
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+from .messages import record_key, record_timestamp
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class MessageStore:
+    """
+    講義ごとに取得済みのメッセージと、最も新しいメッセージの日時を保存するストア
+
+    次回の取得ではその日時を newer_than として送り、新着分だけを取得する。
+    取得済みかどうかはレコードのIDまたは日時と本文（record_key）で判定する。
+    """
+
+    def __init__(self, path=None):
+        """
+        初期化
+
+        Args:
+            path: 保存先のJSONファイル（Noneの場合はメモリ上のみ）
+        """
+        self.path = path
+        self._lectures = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path is not None:
+            self._load()
+
+    def newer_than(self, lecture_id, default):
+        """前回までに取得した最新メッセージの日時（未取得の講義は default）"""
+        with self._lock:
+            entry = self._lectures.get(lecture_id)
+        if not entry or not entry.get("newer_than"):
+            return default
+        return datetime.strptime(entry["newer_than"], TIMESTAMP_FORMAT)
+
+    def messages(self, lecture_id):
+        """保存済みのメッセージ"""
+        with self._lock:
+            entry = self._lectures.get(lecture_id)
+            return list(entry["messages"]) if entry else []
+
+    def merge(self, lecture_id, records):
+        """
+        新しく取得したレコードを保存済みのメッセージに統合する
+
+        最新メッセージの日時はサーバーが返した日時からだけ進める（ローカルの時計は
+        サーバーとずれている可能性があり、進めすぎると取得漏れになるため）。
+
+        Args:
+            lecture_id: 講義ID
+            records: タイムラインAPIのレコード
+
+        Returns:
+            (講義の全メッセージ, 新着メッセージ)。どちらも (キー, 本文) のリスト
+        """
+        with self._lock:
+            entry = self._lectures.setdefault(
+                lecture_id, {"newer_than": None, "messages": [], "keys": []}
+            )
+            previous = entry["newer_than"]
+            known = set(entry["keys"])
+            new_messages = []
+            new_keys = []
+            newest = None
+            for record in records:
+                timestamp = record_timestamp(record)
+                if timestamp is not None and (newest is None or timestamp > newest):
+                    newest = timestamp
+                message = record.get("message")
+                if message is None:
+                    continue
+                key = record_key(record)
+                if key in known:
+                    continue
+                known.add(key)
+                new_keys.append(key)
+                new_messages.append(message)
+            if newest is not None:
+                newest_str = newest.strftime(TIMESTAMP_FORMAT)
+                if previous is None or newest_str > previous:
+                    entry["newer_than"] = newest_str
+            # タイムラインは新しい順に並ぶため、新着分を先頭に置く
+            entry["messages"] = new_messages + entry["messages"]
+            entry["keys"] = new_keys + entry["keys"]
+            if records:
+                self._dirty = True
+            return (
+                list(zip(entry["keys"], entry["messages"])), list(zip(new_keys, new_messages))
+            )
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._lectures = data.get("lectures", {})
+
+    def save(self):
+        """変更があればファイルに保存"""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            data = json.dumps({"lectures": self._lectures}, ensure_ascii=False)
+            self._dirty = False
+        path = os.fspath(self.path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
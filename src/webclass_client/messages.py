@@ -1,20 +1,87 @@
-import re
 from datetime import datetime
 
+from dateutil import parser as date_parser
+
+from .lectures import course_login
+from .metrics import METRICS
+
+# タイムラインAPIのレコードで日時を表す可能性があるキー
+RECORD_DATE_KEYS = ("date", "created_at", "created", "updated_at", "timestamp")
+# タイムラインAPIのレコードでメッセージのIDを表す可能性があるキー
+RECORD_ID_KEYS = ("id", "message_id")
+
 def get_lecture_message(url, lecture_id, acs, cookie, session, date, logger):
-    date_format = "%Y-%m-%d %H:%M:%S"
-    date_obj = datetime.strptime(f"{date} 00:00:00", date_format)
     if url is None or cookie is None:
         logger.error("did not login")
         return []
+    course_login(url, lecture_id, acs, cookie, session)
+    return fetch_lecture_message(url, lecture_id, cookie, session, date, logger)
+
+def fetch_lecture_message(url, lecture_id, cookie, session, date, logger):
+    """講義ログイン済みのセッションでタイムラインのメッセージを取得する"""
+    lecture_message = parse_lecture_messages(
+        {"records": fetch_lecture_records(url, lecture_id, cookie, session, date)}
+    )
+    logger.info(f"found {len(lecture_message)} messages")
+    return lecture_message
+
+def fetch_lecture_records(url, lecture_id, cookie, session, date):
+    """講義ログイン済みのセッションでタイムラインのレコードをそのまま取得する"""
+    response = session.get(messages_url(url, lecture_id, date), cookies=cookie)
+    with METRICS.timer("parse_messages"):
+        output = response.json()
+    return output.get("records", [])
+
+def messages_url(url, lecture_id, date):
+    """date（"YYYY-MM-DD" またはdatetime）より新しいメッセージを取得するURL"""
+    if isinstance(date, datetime):
+        date_obj = date
+    else:
+        date_obj = datetime.strptime(f"{date} 00:00:00", "%Y-%m-%d %H:%M:%S")
+    return f"{url}/webclass/course.php/{lecture_id}/api/timeline/messages?head=0&filter=false&newer_than={date_obj.strftime('%Y-%m-%d+%H:%M:%S')}"
+
+def parse_lecture_messages(output):
     lecture_message = []
-    login_url = f"{url}/webclass/course.php/{lecture_id}/login?acs_={acs['acs_']}"
-    acs_html = session.post(login_url, data=acs, cookies=cookie)
-    acs["acs_"] = re.findall(r'acs_=([a-zA-Z0-9]+)', acs_html.text)[-1]
-    messages_url = f"{url}/webclass/course.php/{lecture_id}/api/timeline/messages?head=0&filter=false&newer_than={date_obj.strftime('%Y-%m-%d+%H:%M:%S')}"
-    output = session.get(messages_url, cookies=cookie).json()
     for record in output.get("records", []):
         message = record.get("message")
         lecture_message.append(message)
-    logger.info(f"found {len(lecture_message)} messages")
-    return lecture_message
\ No newline at end of file
+    return lecture_message
+
+def record_timestamp(record):
+    """レコードの日時を取得（見つからない場合はNone）"""
+    for key in RECORD_DATE_KEYS:
+        value = record.get(key)
+        if not value:
+            continue
+        try:
+            if isinstance(value, (int, float)):
+                return datetime.fromtimestamp(value)
+            timestamp = date_parser.parse(str(value))
+        except (ValueError, OverflowError, OSError):
+            continue
+        if timestamp.tzinfo is not None:
+            # タイムゾーン付きの日時はローカル時刻に変換してから比較できる形にする
+            timestamp = timestamp.astimezone().replace(tzinfo=None)
+        return timestamp
+    return None
+
+def text_key(message):
+    """本文だけから作るキー（IDも日時もないレコード、キーのないメッセージ用）"""
+    return f"text:{message}"
+
+def record_key(record):
+    """
+    レコードを識別するキー
+
+    サーバーのIDがあればそれを、なければ日時と本文を使う（同じ本文のお知らせが
+    繰り返し投稿されても別のメッセージとして扱うため）。どちらもない場合は本文のみ。
+    """
+    for key in RECORD_ID_KEYS:
+        value = record.get(key)
+        if value is not None and value != "":
+            return f"id:{value}"
+    message = record.get("message")
+    timestamp = record_timestamp(record)
+    if timestamp is None:
+        return text_key(message)
+    return f"{timestamp.strftime('%Y-%m-%d %H:%M:%S')}\x1f{message}"
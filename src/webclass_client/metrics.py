@@ -0,0 +1,202 @@
+"""
+リクエスト数・転送量・所要時間の計測
+"""
+import cProfile
+import functools
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# URLのパスからエンドポイントの種類を判定する（上から順に照合）
+ENDPOINT_PATTERNS = (
+    ("login", re.compile(r"/webclass/login\.php")),
+    ("logout", re.compile(r"/webclass/logout\.php")),
+    ("messages", re.compile(r"/webclass/course\.php/[^/]+/api/timeline/messages")),
+    ("course_login", re.compile(r"/webclass/course\.php/[^/]+/login")),
+    ("course", re.compile(r"/webclass/course\.php/")),
+    ("dashboard", re.compile(r"/webclass/?$")),
+)
+
+
+def endpoint_type(url):
+    """URLをエンドポイントの種類（login / dashboard / course / messages など）に分類"""
+    path = urlsplit(url).path
+    for name, pattern in ENDPOINT_PATTERNS:
+        if pattern.search(path):
+            return name
+    return "other"
+
+
+class Metrics:
+    """
+    エンドポイントごとのリクエスト数・転送量・待ち時間と、処理段階ごとの所要時間を集計する
+
+    requestsのセッションに attach() するとレスポンスごとに記録する。
+    処理段階は timer() で囲んだ区間の時間を記録する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """集計をすべて0に戻す"""
+        with self._lock:
+            self._requests = {}
+            self._stages = {}
+            self._started = time.time()
+
+    def attach(self, session):
+        """requestsのセッションのレスポンスを記録する（同じセッションに重複して登録しない）"""
+        hooks = session.hooks.setdefault("response", [])
+        if self._on_response not in hooks:
+            hooks.append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        self.record_request(
+            endpoint_type(response.url),
+            response.elapsed.total_seconds(),
+            len(response.content),
+            response.status_code,
+        )
+
+    def record_request(self, endpoint, seconds, size, status):
+        """リクエスト1件を記録"""
+        with self._lock:
+            entry = self._requests.setdefault(endpoint, {
+                "count": 0, "errors": 0, "bytes": 0, "seconds": 0.0, "max_seconds": 0.0
+            })
+            entry["count"] += 1
+            entry["bytes"] += size
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            if status >= 400:
+                entry["errors"] += 1
+
+    def record_stage(self, stage, seconds):
+        """処理段階の所要時間を記録"""
+        with self._lock:
+            entry = self._stages.setdefault(stage, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += seconds
+
+    @contextmanager
+    def timer(self, stage):
+        """with で囲んだ区間の所要時間を stage として記録"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - started)
+
+    def timed(self, stage):
+        """関数の実行時間を stage として記録するデコレーター"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """集計結果の辞書"""
+        with self._lock:
+            requests = {name: dict(entry) for name, entry in self._requests.items()}
+            stages = {name: dict(entry) for name, entry in self._stages.items()}
+            started = self._started
+        for entry in requests.values():
+            entry["avg_seconds"] = entry["seconds"] / entry["count"] if entry["count"] else 0.0
+        return {
+            "started_at": datetime.fromtimestamp(started).strftime("%Y-%m-%d %H:%M:%S"),
+            "elapsed": time.time() - started,
+            "requests": requests,
+            "total_requests": sum(entry["count"] for entry in requests.values()),
+            "total_bytes": sum(entry["bytes"] for entry in requests.values()),
+            "stages": stages,
+        }
+
+    def write_json(self, path):
+        """集計結果をJSONファイルに保存"""
+        _write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path, prefix="webclass"):
+        """集計結果をPrometheus（node_exporterのtextfile collector）形式で保存"""
+        summary = self.summary()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{prefix}_{name} {value}")
+
+        requests = sorted(summary["requests"].items())
+        metric("requests_total", "counter", "HTTP requests sent, by endpoint type.",
+               [({"endpoint": name}, entry["count"]) for name, entry in requests])
+        metric("request_errors_total", "counter", "HTTP responses with status >= 400.",
+               [({"endpoint": name}, entry["errors"]) for name, entry in requests])
+        metric("response_bytes_total", "counter", "Response body bytes received.",
+               [({"endpoint": name}, entry["bytes"]) for name, entry in requests])
+        metric("request_seconds_total", "counter", "Total time until response headers.",
+               [({"endpoint": name}, f"{entry['seconds']:.6f}") for name, entry in requests])
+        metric("request_seconds_max", "gauge", "Slowest request in the run.",
+               [({"endpoint": name}, f"{entry['max_seconds']:.6f}") for name, entry in requests])
+        stages = sorted(summary["stages"].items())
+        metric("stage_seconds_total", "counter", "Time spent per processing stage.",
+               [({"stage": name}, f"{entry['seconds']:.6f}") for name, entry in stages])
+        metric("stage_runs_total", "counter", "Number of times each stage ran.",
+               [({"stage": name}, entry["count"]) for name, entry in stages])
+        metric("run_duration_seconds", "gauge", "Wall time of the run.",
+               [({}, f"{summary['elapsed']:.3f}")])
+        metric("last_run_timestamp_seconds", "gauge", "Unix time the metrics were written.",
+               [({}, int(time.time()))])
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _write_atomic(path, text):
+    path = os.fspath(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def profile_run(output_dir, logger, top=30):
+    """
+    with で囲んだ区間をcProfileとtracemallocで計測し、output_dir に保存する
+
+    profile.pstats（python -m pstats で閲覧）と、確保したメモリの多い
+    行の一覧 tracemalloc.txt を出力する。
+    """
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        os.makedirs(output_dir, exist_ok=True)
+        pstats_path = os.path.join(output_dir, "profile.pstats")
+        profiler.dump_stats(pstats_path)
+        lines = [f"current: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB", ""]
+        lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:top])
+        _write_atomic(os.path.join(output_dir, "tracemalloc.txt"), "\n".join(lines) + "\n")
+        logger.info(f"プロファイルを保存しました: {pstats_path}")
+
+
+# プロセス全体で共有する計測結果
+METRICS = Metrics()
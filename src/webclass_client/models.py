@@ -0,0 +1,208 @@
+"""
+講義・課題・お知らせのデータ型
+
+日時は解析時に一度だけdatetimeに変換し、以降は比較・並べ替え・表示に
+そのまま使う。大量に生成されるため、インスタンス辞書を持たない
+__slots__ のクラスとしている。
+"""
+import hashlib
+from datetime import datetime
+
+# WebClassの講義ページ上の日時の形式
+DATE_FORMAT = "%Y/%m/%d %H:%M"
+# 緊急度の境界（期限までの残り日数）
+URGENT_DAYS = 3
+WARNING_DAYS = 7
+
+
+def content_id(*parts):
+    """内容から短く安定したIDを生成する（HTMLのdata属性やlocalStorageのキーに使う）"""
+    joined = "\x1f".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_datetime(text):
+    """WebClassの日時文字列（YYYY/MM/DD HH:MM）を解析（空の場合はNone、不正な場合はValueError）"""
+    if not text:
+        return None
+    return datetime.strptime(text.strip(), DATE_FORMAT)
+
+
+def format_datetime(value):
+    """日時をWebClassの形式の文字列に戻す（Noneの場合は空文字列）"""
+    return value.strftime(DATE_FORMAT) if value is not None else ""
+
+
+def urgency(deadline, now):
+    """期限までの残り日数から緊急度（"urgent" / "warning" / "normal"）を返す"""
+    if deadline is None:
+        return "normal"
+    days_left = (deadline - now).days
+    if days_left <= URGENT_DAYS:
+        return "urgent"
+    if days_left <= WARNING_DAYS:
+        return "warning"
+    return "normal"
+
+
+def _iso(value):
+    return value.isoformat(timespec="minutes") if value is not None else None
+
+
+def _from_iso(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+class Course:
+    """ダッシュボードの講義一覧の1件"""
+
+    __slots__ = ("lecture_id", "name", "url", "acs")
+
+    def __init__(self, lecture_id, name, url, acs):
+        self.lecture_id = lecture_id
+        self.name = name
+        self.url = url
+        self.acs = acs
+
+    def __eq__(self, other):
+        if not isinstance(other, Course):
+            return NotImplemented
+        return (self.lecture_id, self.name, self.url, self.acs) == (
+            other.lecture_id, other.name, other.url, other.acs
+        )
+
+    def __repr__(self):
+        return f"Course({self.lecture_id!r}, {self.name!r})"
+
+
+class Assignment:
+    """
+    講義ページの項目（課題・資料など）1件
+
+    受付期間は datetime（期間の表示がない項目はNone）で保持する。
+    id は講義名と項目名から作る安定したIDで、重複の除去とHTML上の識別に使う。
+    """
+
+    __slots__ = ("name", "category", "available_from", "deadline", "section", "subject", "_id")
+
+    def __init__(self, name, category, available_from=None, deadline=None, section=None,
+                 subject=None):
+        self.name = name
+        self.category = category
+        self.available_from = available_from
+        self.deadline = deadline
+        self.section = section
+        self.subject = subject
+        self._id = None
+
+    @property
+    def id(self):
+        """講義名と項目名から作る安定したID（必要になった時点で一度だけ計算する）"""
+        if self._id is None:
+            self._id = content_id(self.subject, self.name)
+        return self._id
+
+    def with_subject(self, subject):
+        """講義名を設定したコピー"""
+        return Assignment(
+            self.name, self.category, self.available_from, self.deadline, self.section, subject
+        )
+
+    def is_open(self, at):
+        """at の時点で受付期間中か（期間の表示がない項目はFalse）"""
+        if self.available_from is None or self.deadline is None:
+            return False
+        return self.available_from < at < self.deadline
+
+    @property
+    def sort_key(self):
+        """期限順に並べるためのキー（期限のない項目は最後）"""
+        return self.deadline or datetime.max
+
+    @property
+    def deadline_text(self):
+        """表示用の期限（YYYY/MM/DD HH:MM）"""
+        return format_datetime(self.deadline)
+
+    def urgency(self, now):
+        """now の時点での緊急度（"urgent" / "warning" / "normal"）"""
+        return urgency(self.deadline, now)
+
+    def to_dict(self):
+        """JSONに保存できる辞書（日時はISO形式）"""
+        return {
+            "name": self.name,
+            "category": self.category,
+            "available_from": _iso(self.available_from),
+            "deadline": _iso(self.deadline),
+            "section": self.section,
+            "subject": self.subject,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict() の辞書から復元"""
+        return cls(
+            data["name"], data["category"], _from_iso(data.get("available_from")),
+            _from_iso(data.get("deadline")), data.get("section"), data.get("subject")
+        )
+
+    def to_row(self):
+        """キャッシュ用の簡潔なリスト（講義名を除く）"""
+        return [
+            self.name, self.category, _iso(self.available_from), _iso(self.deadline), self.section
+        ]
+
+    @classmethod
+    def from_row(cls, row, subject=None):
+        """to_row() のリストから復元"""
+        name, category, available_from, deadline, section = row
+        return cls(name, category, _from_iso(available_from), _from_iso(deadline), section, subject)
+
+    def __eq__(self, other):
+        if not isinstance(other, Assignment):
+            return NotImplemented
+        return (
+            self.name, self.category, self.available_from, self.deadline, self.section, self.subject
+        ) == (
+            other.name, other.category, other.available_from, other.deadline, other.section,
+            other.subject
+        )
+
+    def __repr__(self):
+        return f"Assignment({self.subject!r}, {self.name!r}, deadline={self.deadline_text!r})"
+
+
+class Message:
+    """
+    講義のお知らせ1件
+
+    key はタイムラインAPIのレコードを識別するキー（messages.record_key）で、
+    同じ本文のお知らせを区別して保存するのに使う。
+    """
+
+    __slots__ = ("subject", "text", "lecture_id", "key", "_id")
+
+    def __init__(self, subject, text, lecture_id=None, key=None):
+        self.subject = subject
+        self.text = text
+        self.lecture_id = lecture_id
+        self.key = key
+        self._id = None
+
+    @property
+    def id(self):
+        """講義名と本文から作る安定したID（必要になった時点で一度だけ計算する）"""
+        if self._id is None:
+            self._id = content_id(self.subject, self.text)
+        return self._id
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (self.subject, self.text, self.lecture_id) == (
+            other.subject, other.text, other.lecture_id
+        )
+
+    def __repr__(self):
+        return f"Message({self.subject!r}, {self.text[:20] if self.text else self.text!r})"
@@ -0,0 +1,107 @@
+"""
+講義ページの解析結果キャッシュ
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# 解析結果の形式を変えた場合は値を上げ、古い形式のキャッシュを使わないようにする
+_CACHE_VERSION = 3
+# 講義ページのリンクにはログインのたびに変わるacsトークンが埋め込まれている
+_ACS_TOKEN = re.compile(rb"acs_=[A-Za-z0-9]+")
+
+
+class ResponseCache:
+    """
+    レスポンス本文のハッシュと解析結果を保存するキャッシュ
+
+    キーは講義IDとURLのパス（acs_パラメータを除く）で、本文のハッシュ（acs_の値を
+    除いて計算する）が前回と同じ場合は保存済みの解析結果を返して解析を省略する。
+    エントリ数が上限を超えた場合は最も古く使われたものから削除する。
+    """
+
+    def __init__(self, path=None, max_entries=128):
+        """
+        初期化
+
+        Args:
+            path: キャッシュを保存するJSONファイル（Noneの場合はメモリ上のみ）
+            max_entries: 保持するエントリの上限
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path is not None:
+            self._load()
+
+    @staticmethod
+    def make_key(lecture_id, url):
+        """講義IDとacs_を除いたURLからキーを作成"""
+        parts = urlsplit(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query) if k != "acs_"]
+        key = f"{lecture_id}:{parts.path}"
+        return f"{key}?{urlencode(query)}" if query else key
+
+    @staticmethod
+    def body_hash(body):
+        """レスポンス本文のハッシュ（ログインごとに変わるacs_の値は除く）"""
+        return hashlib.sha256(_ACS_TOKEN.sub(b"acs_=", body)).hexdigest()
+
+    def lookup(self, key, body_hash):
+        """
+        本文のハッシュが一致する場合に保存済みの解析結果を返す
+
+        解析結果はコピーせずに返すため、呼び出し側で変更しないこと
+        （講義ページの解析結果は Assignment に変換してから使う）。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["hash"] != body_hash:
+                return None
+            self._entries.move_to_end(key)
+            return entry["parsed"]
+
+    def store(self, key, body_hash, parsed):
+        """解析結果を保存（保存後は parsed を変更しないこと）"""
+        with self._lock:
+            self._entries[key] = {"hash": body_hash, "parsed": parsed}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != _CACHE_VERSION:
+            return
+        for key, entry in data.get("entries", []):
+            self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        """変更があればファイルに保存"""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            data = {"version": _CACHE_VERSION, "entries": list(self._entries.items())}
+            self._dirty = False
+        path = os.fspath(self.path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,115 @@
+"""
+講義ごとの再取得間隔を調整するスケジューラー
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+
+def snapshot_signature(snapshot):
+    """スナップショットの課題とメッセージから変更検知用のハッシュを作成"""
+    payload = json.dumps(
+        [
+            [assignment.to_dict() for assignment in snapshot["assignments"]],
+            [message.text for message in snapshot["messages"]],
+        ],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def nearest_deadline(assignments, now):
+    """now より後で最も近い課題の期限（なければNone）"""
+    deadlines = [
+        assignment.deadline for assignment in assignments
+        if assignment.deadline is not None and assignment.deadline > now
+    ]
+    return min(deadlines, default=None)
+
+
+class PollScheduler:
+    """
+    講義ごとに次回の取得時刻を管理する
+
+    変更があった講義は最短間隔に戻し、変更のない講義は間隔を backoff 倍ずつ
+    max_interval まで延ばす。期限が近い課題がある講義は、期限までに
+    deadline_polls 回程度は取得できるよう間隔を短くする。
+    """
+
+    def __init__(self, min_interval=300, max_interval=6 * 60 * 60, backoff=2.0, deadline_polls=12):
+        """
+        初期化
+
+        Args:
+            min_interval: 最短の取得間隔（秒）
+            max_interval: 最長の取得間隔（秒）
+            backoff: 変更がなかった場合に間隔を延ばす倍率
+            deadline_polls: 最も近い期限までに取得する回数の目安
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.deadline_polls = deadline_polls
+        self._courses = {}
+
+    def sync(self, lecture_ids, now):
+        """講義一覧に合わせる（新しい講義はすぐに取得し、なくなった講義は削除）"""
+        lecture_ids = list(lecture_ids)
+        for lecture_id in lecture_ids:
+            self._courses.setdefault(lecture_id, {
+                "interval": self.min_interval, "next_at": now, "signature": None
+            })
+        for lecture_id in set(self._courses) - set(lecture_ids):
+            del self._courses[lecture_id]
+
+    def due(self, now):
+        """取得時刻を過ぎた講義IDを、取得時刻の早い順に返す"""
+        due = [
+            (state["next_at"], lecture_id)
+            for lecture_id, state in self._courses.items()
+            if state["next_at"] <= now
+        ]
+        return [lecture_id for _, lecture_id in sorted(due)]
+
+    def next_at(self):
+        """最も早い次回の取得時刻（講義がなければNone）"""
+        if not self._courses:
+            return None
+        return min(state["next_at"] for state in self._courses.values())
+
+    def interval(self, lecture_id):
+        """講義の現在の取得間隔（秒）"""
+        return self._courses[lecture_id]["interval"]
+
+    def record(self, lecture_id, snapshot, now):
+        """
+        取得結果を記録して次回の取得時刻を決める
+
+        Returns:
+            前回の取得から課題またはメッセージが変わっていればTrue
+        """
+        state = self._courses.setdefault(lecture_id, {
+            "interval": self.min_interval, "next_at": now, "signature": None
+        })
+        signature = snapshot_signature(snapshot)
+        changed = signature != state["signature"]
+        if changed:
+            interval = self.min_interval
+        else:
+            interval = min(state["interval"] * self.backoff, self.max_interval)
+        deadline = nearest_deadline(snapshot["assignments"], now)
+        if deadline is not None:
+            until_deadline = (deadline - now).total_seconds() / self.deadline_polls
+            interval = min(interval, max(self.min_interval, until_deadline))
+        state.update(
+            interval=interval, next_at=now + timedelta(seconds=interval), signature=signature
+        )
+        return changed
+
+    def record_failure(self, lecture_id, now):
+        """取得に失敗した講義は間隔を延ばして再試行する"""
+        state = self._courses.get(lecture_id)
+        if state is None:
+            return
+        state["interval"] = min(state["interval"] * self.backoff, self.max_interval)
+        state["next_at"] = now + timedelta(seconds=state["interval"])
@@ -1,9 +1,27 @@
-import requests
+import json
+import os
 import re
 
+from .metrics import METRICS
+from .transport import DEFAULT_TIMEOUT, build_session
+
 class SessionManager:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, pool_size=10, timeout=DEFAULT_TIMEOUT, max_retries=3, backoff=0.5,
+                 rate_limiter=None, recorder=None, replayer=None):
+        self._session_options = {
+            "pool_size": pool_size,
+            "timeout": timeout,
+            "max_retries": max_retries,
+            "backoff": backoff,
+            "rate_limiter": rate_limiter,
+            "recorder": recorder,
+            "replayer": replayer,
+        }
+        self._reset()
+
+    def _reset(self):
+        self.session = build_session(**self._session_options)
+        METRICS.attach(self.session)
         self.acs = {"acs_": "12345678"}
         self.cookie = None
 
@@ -17,7 +35,7 @@ class SessionManager:
         try:
             acs_url = f"{url}/webclass/login.php"
             response = self.session.post(acs_url, data=login_info)
-            acs_value = re.findall(r'acs_=([a-zA-Z0-9]+)', response.text)[-1]
+            acs_value = re.findall(rb'acs_=([a-zA-Z0-9]+)', response.content)[-1].decode("ascii")
             self.acs = {"acs_": acs_value}
             self.cookie = {"WBT_Session": response.cookies.get('WBT_Session')}
             logger.info("login success")
@@ -31,12 +49,62 @@ class SessionManager:
         logger.info("set wbt_session success")
         return self.cookie
 
+    def save_session(self, path, url, username, logger):
+        if self.cookie is None or not self.cookie.get("WBT_Session"):
+            logger.error("no session to save")
+            return False
+        data = {
+            "url": url,
+            "username": username,
+            "wbt_session": self.cookie["WBT_Session"],
+            "acs": self.acs["acs_"],
+        }
+        try:
+            path = os.fspath(path)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # 所有者のみ読み書きできるファイルとして作成する
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.chmod(path, 0o600)
+            logger.info("save session success")
+            return True
+        except OSError as e:
+            logger.error(f"save session failed: {e}")
+            return False
+
+    def load_session(self, path, url, username, logger):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError) as e:
+            logger.warning(f"load session failed: {e}")
+            return None, None
+        if data.get("url") != url or data.get("username") != username:
+            return None, None
+        if not data.get("wbt_session") or not data.get("acs"):
+            return None, None
+        self.acs = {"acs_": data["acs"]}
+        self.cookie = {"WBT_Session": data["wbt_session"]}
+        logger.info("load session success")
+        return self.acs, self.cookie
+
+    @staticmethod
+    def clear_session(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
     def logout(self, url, logger):
         if url is None or self.cookie is None:
             logger.error("did not login")
             return False
         logout_url = f"{url}/webclass/logout.php"
         self.session.get(logout_url, cookies=self.cookie)
-        self.__init__()
+        self.session.close()
+        self._reset()
         logger.info("logout success")
         return True
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+講義ごとの取得結果（スナップショット）
+"""
+
+from .assignments import assignment_filter, extract_assignments
+from .lectures import DEFAULT_PARSER, course_login, fetch_lecture_info
+from .messages import fetch_lecture_records, record_key
+from .metrics import METRICS
+from .models import Message
+
+
+@METRICS.timed("crawl_course")
+def crawl_course(url, lecture_id, subject, acs, cookie, session, date, message_date, logger,
+                 cache=None, store=None, parser=DEFAULT_PARSER, item_filter=None):
+    """
+    講義に1回だけログインし、講義ページとタイムラインのメッセージをまとめて取得する
+
+    Args:
+        url: WebClassのURL
+        lecture_id: 講義ID
+        subject: 講義名
+        acs: 講義リンクのacs
+        cookie: WBT_Sessionクッキー
+        session: requestsのセッション
+        date: 課題の受付期間判定に使う日時
+        message_date: この日付より新しいメッセージを取得する
+        logger: ロガー
+        cache: 講義ページの解析結果キャッシュ（ResponseCache）
+        store: メッセージストア（MessageStore）。指定した場合は前回以降の新着分だけを取得する
+        parser: BeautifulSoupのパーサー名（"html.parser" / "lxml" など）
+        item_filter: 講義ページの解析時に項目を絞り込む ItemFilter（Noneの場合は
+            課題の抽出に使わない資料と期限切れの項目を読み飛ばす）
+
+    Returns:
+        講義ID・講義名・講義ページの項目・受付中の課題（Assignment のリスト）・
+        メッセージ・新着メッセージ（Message のリスト）をまとめた辞書
+    """
+    course_acs = course_login(url, lecture_id, acs, cookie, session)
+    if item_filter is None:
+        item_filter = assignment_filter(date)
+    lecture_info = fetch_lecture_info(
+        url, lecture_id, course_acs, cookie, session, logger, cache, parser, item_filter
+    )
+    if store is None:
+        records = fetch_lecture_records(url, lecture_id, cookie, session, message_date)
+        messages = [(record_key(record), record.get("message")) for record in records]
+        new_messages = messages
+        logger.info(f"found {len(messages)} messages")
+    else:
+        newer_than = store.newer_than(lecture_id, message_date)
+        records = fetch_lecture_records(url, lecture_id, cookie, session, newer_than)
+        messages, new_messages = store.merge(lecture_id, records)
+        logger.info(f"found {len(new_messages)} new messages ({len(messages)} in total)")
+    # 新着メッセージは全メッセージの先頭に並んでいるため、同じオブジェクトを共有する
+    messages = [Message(subject, text, lecture_id, key) for key, text in messages]
+    new_count = len(new_messages)
+    return {
+        "lecture_id": lecture_id,
+        "subject": subject,
+        "lecture_info": lecture_info,
+        "assignments": extract_assignments(lecture_info, subject, date, logger),
+        "messages": messages,
+        "new_messages": messages[:new_count],
+    }
+
+
+def split_snapshots(snapshots):
+    """講義ごとの取得結果を (課題のリスト, メッセージのリスト) に展開する"""
+    assignments = []
+    messages = []
+    for snapshot in snapshots:
+        assignments.extend(snapshot["assignments"])
+        messages.extend(snapshot["messages"])
+    return assignments, messages
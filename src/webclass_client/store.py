@@ -0,0 +1,182 @@
+"""
+講義・課題・お知らせを保存するSQLiteストア
+"""
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from .messages import text_key
+from .models import Assignment
+
+# SQLite上では文字列比較で範囲検索できるISO形式で日時を保存する
+DB_DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    lecture_id TEXT PRIMARY KEY,
+    name TEXT,
+    url TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    lecture_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT,
+    available_from TEXT,
+    deadline TEXT,
+    updated_at TEXT NOT NULL,
+    UNIQUE (lecture_id, name)
+);
+CREATE INDEX IF NOT EXISTS idx_assignments_deadline ON assignments (deadline);
+CREATE INDEX IF NOT EXISTS idx_assignments_lecture ON assignments (lecture_id, deadline);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    lecture_id TEXT NOT NULL,
+    message_key TEXT NOT NULL,
+    message TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    is_read INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (lecture_id, message_key)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages (lecture_id, is_read);
+"""
+
+
+def _to_db_date(value):
+    """datetimeをDB用の形式に変換"""
+    return value.strftime(DB_DATE_FORMAT) if value is not None else None
+
+
+def _from_db_date(value):
+    """DB用の日時文字列をdatetimeに戻す"""
+    if not value:
+        return None
+    return datetime.strptime(value, DB_DATE_FORMAT)
+
+
+class WebClassStore:
+    """講義・課題・お知らせをローカルに保存し、ネットワークなしで検索するストア"""
+
+    def __init__(self, path):
+        """
+        初期化
+
+        Args:
+            path: SQLiteデータベースファイルのパス（":memory:" も可）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def upsert_courses(self, catalog):
+        """講義カタログの内容を保存"""
+        now = datetime.now().strftime(DB_DATE_FORMAT)
+        rows = [
+            (lecture_id, catalog.name(lecture_id), catalog.url(lecture_id), now)
+            for lecture_id in catalog
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO courses (lecture_id, name, url, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (lecture_id) DO UPDATE SET "
+                "name = excluded.name, url = excluded.url, updated_at = excluded.updated_at",
+                rows
+            )
+
+    def upsert_snapshots(self, snapshots):
+        """crawl()の結果（講義ごとのスナップショット）を保存"""
+        now = datetime.now().strftime(DB_DATE_FORMAT)
+        with self._lock, self._conn:
+            for snapshot in snapshots:
+                lecture_id = snapshot["lecture_id"]
+                self._conn.execute(
+                    "INSERT INTO courses (lecture_id, name, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (lecture_id) DO UPDATE SET "
+                    "name = excluded.name, updated_at = excluded.updated_at",
+                    (lecture_id, snapshot["subject"], now)
+                )
+                self._conn.executemany(
+                    "INSERT INTO assignments "
+                    "(lecture_id, name, category, available_from, deadline, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (lecture_id, name) DO UPDATE SET "
+                    "category = excluded.category, available_from = excluded.available_from, "
+                    "deadline = excluded.deadline, updated_at = excluded.updated_at",
+                    [
+                        (
+                            lecture_id,
+                            item.name,
+                            item.category,
+                            _to_db_date(item.available_from),
+                            _to_db_date(item.deadline),
+                            now,
+                        )
+                        for item in snapshot["assignments"]
+                    ]
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO messages (lecture_id, message_key, message, first_seen) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (lecture_id, message.key or text_key(message.text), message.text, now)
+                        for message in snapshot["messages"]
+                        if message.text is not None
+                    ]
+                )
+
+    def due_within(self, days, now=None):
+        """
+        現在から days 日以内に期限を迎える課題を期限順に取得
+
+        Returns:
+            Assignment のリスト
+        """
+        now = now or datetime.now()
+        start = now.strftime(DB_DATE_FORMAT)
+        end = (now + timedelta(days=days)).strftime(DB_DATE_FORMAT)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.name, a.category, a.available_from, a.deadline, c.name AS subject "
+                "FROM assignments a LEFT JOIN courses c ON c.lecture_id = a.lecture_id "
+                "WHERE a.deadline > ? AND a.deadline <= ? ORDER BY a.deadline",
+                (start, end)
+            ).fetchall()
+        return [
+            Assignment(
+                row["name"], row["category"], _from_db_date(row["available_from"]),
+                _from_db_date(row["deadline"]), subject=row["subject"]
+            )
+            for row in rows
+        ]
+
+    def unread_messages(self, lecture_id):
+        """講義の未読メッセージを取得"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM messages WHERE lecture_id = ? AND is_read = 0 "
+                "ORDER BY id",
+                (lecture_id,)
+            ).fetchall()
+        return [row["message"] for row in rows]
+
+    def mark_read(self, lecture_id, message=None):
+        """メッセージを既読にする（message を省略した場合は講義の全メッセージ）"""
+        with self._lock, self._conn:
+            if message is None:
+                self._conn.execute(
+                    "UPDATE messages SET is_read = 1 WHERE lecture_id = ?", (lecture_id,)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE messages SET is_read = 1 WHERE lecture_id = ? AND message = ?",
+                    (lecture_id, message)
+                )
+
+    def close(self):
+        """データベースを閉じる"""
+        with self._lock:
+            self._conn.close()
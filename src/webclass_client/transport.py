@@ -0,0 +1,335 @@
+"""
+requestsのセッションに設定する接続プール・タイムアウト・再試行・流量制限と、
+HTTPのやり取りの記録・再生
+"""
+import collections
+import json
+import os
+import random
+import threading
+import time
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+from http.cookies import CookieError, SimpleCookie
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import create_cookie
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.exceptions import ConnectTimeoutError
+
+# 再試行するHTTPステータス（混雑・一時的な障害）
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# 送り直しても結果が変わらないメソッド（urllib3 の Retry.DEFAULT_ALLOWED_METHODS と同じ）
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+DEFAULT_TIMEOUT = (10, 30)
+# 記録の一覧（1行に1件のJSON）と本文を保存するディレクトリ
+EXCHANGES_FILE = "exchanges.jsonl"
+BODIES_DIR = "bodies"
+# 本文はデコード済みで保存するため、再生時に矛盾するヘッダーは記録しない
+_UNRECORDED_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+
+class TokenBucket:
+    """
+    トークンバケットによる流量制限
+
+    1秒あたり rate 個のトークンが burst 個まで溜まり、リクエストごとに1個消費する。
+    複数のスレッド・セッションで共有できる。
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        初期化
+
+        Args:
+            rate: 1秒あたりに送れるリクエスト数
+            burst: 連続して送れるリクエスト数の上限（Noneの場合は rate と同じ、最小1）
+        """
+        if rate <= 0:
+            raise ValueError("rate は正の数を指定してください")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1個取得する（足りない場合は溜まるまで待つ）。待った秒数を返す"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class ResilientAdapter(HTTPAdapter):
+    """
+    タイムアウトの既定値・指数バックオフ（ジッター付き）の再試行・流量制限を行うアダプター
+
+    接続エラー・タイムアウトと RETRY_STATUSES のレスポンスを max_retries 回まで
+    再試行する。ただしPOSTなど IDEMPOTENT_METHODS 以外のリクエストは、サーバーが
+    処理済みかもしれないため、リクエストを送る前の接続の失敗だけを再試行する。
+    待ち時間は backoff * 2^試行回数 を上限とする一様乱数（full jitter）で、
+    Retry-After ヘッダーがあればそちらを優先する。
+
+    attempt_hooks の関数は再試行を含む送信のたびに request を引数に呼ばれる
+    （RequestBudget がサーバーへのアクセス回数を数えるのに使う）。
+    """
+
+    def __init__(self, pool_size=10, timeout=DEFAULT_TIMEOUT, max_retries=3, backoff=0.5,
+                 max_backoff=30.0, rate_limiter=None):
+        """
+        初期化
+
+        Args:
+            pool_size: 接続先ホストごとに保持する接続数
+            timeout: リクエストごとのタイムアウト（秒、または (接続, 読み込み) のタプル）
+            max_retries: 再試行の回数
+            backoff: 再試行の待ち時間の基準（秒）
+            max_backoff: 再試行の待ち時間の上限（秒）
+            rate_limiter: TokenBucket（Noneの場合は流量制限なし）
+        """
+        super().__init__(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.timeout = timeout
+        self.retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter
+        self.attempt_hooks = []
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout
+        idempotent = request.method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            for hook in self.attempt_hooks:
+                hook(request)
+            try:
+                response = super().send(request, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.retries or not (idempotent or _before_sending(e)):
+                    raise
+                time.sleep(self._delay(attempt))
+                attempt += 1
+                continue
+            if (not idempotent or response.status_code not in RETRY_STATUSES
+                    or attempt >= self.retries):
+                return response
+            delay = self._retry_after(response)
+            response.close()
+            time.sleep(delay if delay is not None else self._delay(attempt))
+            attempt += 1
+
+    def _delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        """Retry-After ヘッダーの秒数（ないか解釈できなければNone）"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.max_backoff)
+
+
+def _before_sending(error):
+    """リクエストを送る前（接続の確立中）に失敗したか"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # 接続の拒否・名前解決の失敗は NewConnectionError（ConnectTimeoutError の派生）になる
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+
+class ExchangeRecorder:
+    """
+    送受信したリクエストとレスポンスを directory に記録する
+
+    レスポンスごとに exchanges.jsonl へ1行追記し、本文は bodies/ に1件1ファイルで
+    保存する。リクエストの本文（ログイン時のパスワードを含む）は記録しない。
+    記録にはセッションのCookieや講義ページ・お知らせが含まれるため、ファイルと
+    ディレクトリは所有者だけが読み書きできる権限で作成する。
+    """
+
+    def __init__(self, directory):
+        """初期化（directory が以前の記録であれば、その記録は削除する）"""
+        self.directory = Path(directory)
+        self._bodies = self.directory / BODIES_DIR
+        self._index = self.directory / EXCHANGES_FILE
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if self._index.exists() and self._bodies.is_dir():
+            for old_body in self._bodies.glob("*.body"):
+                old_body.unlink()
+            os.chmod(self._bodies, 0o700)
+        self._bodies.mkdir(mode=0o700, exist_ok=True)
+        fd = os.open(self._index, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.close(fd)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, request, response):
+        """リクエスト1件とそのレスポンスを記録"""
+        raw_headers = getattr(response.raw, "headers", None) or response.headers
+        headers = [
+            [key, value] for key, value in raw_headers.items()
+            if key.lower() not in _UNRECORDED_HEADERS
+        ]
+        body = response.content
+        with self._lock:
+            self._count += 1
+            body_name = f"{BODIES_DIR}/{self._count:05d}.body"
+            fd = os.open(
+                self.directory / body_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+            )
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            entry = {
+                "seq": self._count,
+                "method": request.method,
+                "url": request.url,
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": headers,
+                "body": body_name,
+                "elapsed": response.elapsed.total_seconds(),
+            }
+            with open(self._index, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class ExchangeReplayer:
+    """
+    ExchangeRecorder の記録から、メソッドとURLが一致するレスポンスを返す
+
+    同じリクエストが複数回記録されている場合は記録した順に返し、
+    使い切った後は最後のレスポンスを返し続ける。
+    """
+
+    def __init__(self, directory):
+        """初期化（記録がない場合は FileNotFoundError）"""
+        self.directory = Path(directory)
+        self._exchanges = collections.defaultdict(collections.deque)
+        with open(self.directory / EXCHANGES_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._exchanges[(entry["method"], entry["url"])].append(entry)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._exchanges.values())
+
+    def lookup(self, method, url):
+        """記録を1件取り出す（ない場合はNone）"""
+        with self._lock:
+            entries = self._exchanges.get((method, url))
+            if not entries:
+                return None
+            return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def body(self, entry):
+        return (self.directory / entry["body"]).read_bytes()
+
+
+class RecordingAdapter(ResilientAdapter):
+    """ResilientAdapter の最終的なレスポンス（再試行後）を ExchangeRecorder に記録する"""
+
+    def __init__(self, recorder, **kwargs):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # elapsed はアダプターから戻った後にセッションが設定するため、ここで計測する
+        response.elapsed = timedelta(seconds=time.perf_counter() - started)
+        self.recorder.record(request, response)
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """ネットワークに接続せず、ExchangeReplayer の記録からレスポンスを作るアダプター"""
+
+    def __init__(self, replayer):
+        super().__init__()
+        self.replayer = replayer
+
+    def send(self, request, **kwargs):
+        entry = self.replayer.lookup(request.method, request.url)
+        if entry is None:
+            raise requests.ConnectionError(
+                f"記録にないリクエストです: {request.method} {request.url}", request=request
+            )
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict()
+        for key, value in entry["headers"]:
+            if key.lower() == "set-cookie":
+                _add_cookies(response.cookies, value, request.url)
+            previous = response.headers.get(key)
+            response.headers[key] = value if previous is None else f"{previous}, {value}"
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = self.replayer.body(entry)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=entry.get("elapsed", 0.0))
+        response.connection = self
+        return response
+
+
+def _add_cookies(jar, header, url):
+    """Set-Cookie ヘッダーの値を jar に追加"""
+    try:
+        cookie = SimpleCookie(header)
+    except CookieError:
+        return
+    domain = urlsplit(url).hostname or ""
+    for name, morsel in cookie.items():
+        jar.set_cookie(create_cookie(name, morsel.value, domain=domain, path=morsel["path"] or "/"))
+
+
+def build_session(pool_size=10, timeout=DEFAULT_TIMEOUT, max_retries=3, backoff=0.5,
+                  rate_limiter=None, recorder=None, replayer=None):
+    """
+    ResilientAdapterを設定したrequestsのセッションを作成
+
+    recorder を指定した場合は送受信を記録し、replayer を指定した場合は
+    ネットワークに接続せず記録したレスポンスを返す。
+    """
+    session = requests.Session()
+    if replayer is not None:
+        adapter = ReplayAdapter(replayer)
+    elif recorder is not None:
+        adapter = RecordingAdapter(
+            recorder, pool_size=pool_size, timeout=timeout, max_retries=max_retries,
+            backoff=backoff, rate_limiter=rate_limiter
+        )
+    else:
+        adapter = ResilientAdapter(
+            pool_size=pool_size, timeout=timeout, max_retries=max_retries,
+            backoff=backoff, rate_limiter=rate_limiter
+        )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session